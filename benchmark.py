@@ -0,0 +1,133 @@
+"""
+    Benchmark of read, CSV export, CSV apply and write paths on synthetic MXE/XLB files (see vc4mxe/synthetic.py).
+    Same arguments give the same files, so numbers from different versions of the code can be compared directly.
+
+    Example: python benchmark.py --records 20000 --repeat 5 --json bench.json
+"""
+import os
+import io
+import csv
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+
+from vc4mxe.templates import readTemplates
+from vc4mxe.xlb import readXLB, loadXLB
+from vc4mxe.reader import readMXEFile, loadEntries
+from vc4mxe.writer import writeMXEFile
+from vc4mxe.csvio import writeMXEtoCSV, applyCSVDIRtoMXE
+from vc4mxe.synthetic import generateMXE, generateXLB, addSyntheticTemplates
+from vc4mxe.cli import DEFAULT_TEMPLATE_PATH
+
+def timeCase(func, repeat: int, setup = None) -> list:
+    """
+        Returns: seconds taken by each of <repeat> calls of func(setup result). Setup is not timed, output of both is swallowed.
+    """
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            arg = setup() if setup is not None else None
+            start = time.perf_counter()
+            func(arg)
+            times.append(time.perf_counter() - start)
+    return times
+
+def loadAllRecords(main_table):
+    """
+        Loads and decodes every record of main table, the way D mode and CSV export do
+    """
+    for entries in main_table.types.values():
+        loadEntries(entries)
+
+def editCSVDir(src_dir: str, dst_dir: str):
+    """
+        Copies exported CSVs with the first plain int column of every row incremented, so applying them changes every record
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    for file_name in os.listdir(src_dir):
+        with open(os.path.join(src_dir, file_name), newline='', encoding='shift-jisx0213') as f:
+            rows = list(csv.reader(f))
+        column = next((i for i, name in enumerate(rows[0]) if i >= 2 and name.split(':', 1)[0] == "<i"), None)
+        if column is not None:
+            for row in rows[1:]:
+                row[column] = str(int(row[column]) + 1)
+        with open(os.path.join(dst_dir, file_name), 'w', newline='', encoding='shift-jisx0213') as f:
+            csv.writer(f).writerows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MXE read/export/apply/write on synthetic files.")
+    parser.add_argument("--records", type=int, default=20000, help="Number of records in synthetic MXE.")
+    parser.add_argument("--xlb-strings", type=int, default=5000, help="Number of strings in synthetic XLB.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of every case.")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for synthetic data.")
+    parser.add_argument("-t", "--template-csv-path", type=str, default=DEFAULT_TEMPLATE_PATH, help="Path to a CSV file containing record templates.")
+    parser.add_argument("--dir", type=str, help="Directory for generated files. Defaults to a temporary directory that is removed afterwards.")
+    parser.add_argument("--json", type=str, help="Also write results to this JSON file.")
+    args = parser.parse_args()
+
+    work_dir = args.dir if args.dir is not None else tempfile.mkdtemp(prefix="mxe_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    mxe_path = os.path.join(work_dir, "bench.mxe")
+    work_mxe_path = os.path.join(work_dir, "work.mxe")
+    xlb_path = os.path.join(work_dir, "text_mx.xlb")
+    csv_dir = os.path.join(work_dir, "csv")
+    edited_csv_dir = os.path.join(work_dir, "csv_edit")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        templates = addSyntheticTemplates(readTemplates(args.template_csv_path))
+        xlb_ids = generateXLB(xlb_path, args.xlb_strings)
+        counts = generateMXE(mxe_path, templates, args.records, xlb_ids=xlb_ids, seed=args.seed)
+        xlb = readXLB(xlb_path)
+        loadXLB(xlb_path, use_cache=True)
+        writeMXEtoCSV(readMXEFile(mxe_path, templates), templates, csv_dir, xlb_path, xlb_list=xlb)
+        editCSVDir(csv_dir, edited_csv_dir)
+
+    def freshModel():
+        shutil.copyfile(mxe_path, work_mxe_path)
+        return readMXEFile(work_mxe_path, templates)
+
+    def editedModel():
+        main_table = freshModel()
+        applyCSVDIRtoMXE(main_table, templates, edited_csv_dir)
+        return main_table
+
+    cases = [
+        ("readTemplates", lambda _: readTemplates(args.template_csv_path), None),
+        ("readXLB", lambda _: readXLB(xlb_path), None),
+        ("readXLB cached index", lambda _: loadXLB(xlb_path, use_cache=True), None),
+        ("readMXEFile", lambda _: readMXEFile(mxe_path, templates), None),
+        ("readMXEFile mmap", lambda _: readMXEFile(mxe_path, templates, use_mmap=True), None),
+        ("readMXEFile all records", lambda _: loadAllRecords(readMXEFile(mxe_path, templates)), None),
+        ("writeMXEtoCSV", lambda main_table: writeMXEtoCSV(main_table, templates, csv_dir, xlb_path, xlb_list=xlb), lambda: readMXEFile(mxe_path, templates)),
+        ("writeMXEtoCSV 2 workers", lambda main_table: writeMXEtoCSV(main_table, templates, csv_dir, xlb_path, workers=2, xlb_list=xlb),
+         lambda: readMXEFile(mxe_path, templates)),
+        ("applyCSVDIRtoMXE", lambda main_table: applyCSVDIRtoMXE(main_table, templates, edited_csv_dir), freshModel),
+        ("writeMXEFile", lambda main_table: writeMXEFile(work_mxe_path, main_table, templates, backup=False), editedModel),
+        ("writeMXEFile atomic", lambda main_table: writeMXEFile(work_mxe_path, main_table, templates, backup=False, atomic=True), editedModel),
+    ]
+
+    print("Python " + platform.python_version() + " on " + platform.platform())
+    print("Synthetic MXE: " + str(args.records) + " records of " + str(len(counts)) + " types, " + str(os.path.getsize(mxe_path)) + " bytes; XLB: "
+          + str(args.xlb_strings) + " strings; seed " + str(args.seed) + "; best/median of " + str(args.repeat) + " runs")
+    print("{:<24} {:>10} {:>10} {:>14}".format("case", "best s", "median s", "best us/record"))
+    results = []
+    for name, func, setup in cases:
+        times = timeCase(func, args.repeat, setup)
+        best = min(times)
+        results.append({ "case": name, "best_s": best, "median_s": statistics.median(times), "times_s": times })
+        print("{:<24} {:>10.4f} {:>10.4f} {:>14.2f}".format(name, best, statistics.median(times), best / args.records * 1e6))
+
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({ "python": platform.python_version(), "platform": platform.platform(), "records": args.records, "xlb_strings": args.xlb_strings,
+                        "seed": args.seed, "repeat": args.repeat, "types": counts, "results": results }, f, indent=2)
+    if args.dir is None:
+        shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+    Reading and editing main MXE table for Valkyria Chronicles 4.
+    Importing the package has no side effects, command line interface is in vc4mxe.cli (python -m vc4mxe).
+"""
+from .settings import MXE_SETTINGS, OUTPUT_MODIFIERS, applyConfigFile
+from .datatypes import DataTypes, bytesToText, objToBytes
+from .records import RecordLayout, RecordData
+from .templates import TemplateRegistry, readTemplates, typeName, typeSelected
+from .xlb import XlbData, XlbIndex, readXLB, loadXLB, xlbFixes, findByIDInXLB
+from .reader import MxeEntry, MainTable, readMXEFile, readMXETOC
+from .writer import writeMXEFile
+from .csvio import writeMXEtoCSV, applyCSVtoMXE, applyCSVDIRtoMXE
+from .columns import RecordColumns
+from .inventory import mxeInventory
+from .mxefile import MxeFile
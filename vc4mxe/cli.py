@@ -0,0 +1,328 @@
+"""
+    Command line interface, see README.md for usage
+"""
+import os
+import io
+import sys
+import glob
+import time
+import json
+import argparse
+from argparse import RawTextHelpFormatter
+import contextlib
+import concurrent.futures
+
+from .settings import MXE_SETTINGS, OUTPUT_MODIFIERS, applyConfigFile
+from .templates import TemplateRegistry, readTemplates, typeSelected
+from .reader import readMXEFile, readMXETOC, loadEntries
+from .writer import writeMXEFile
+from .csvio import writeMXEtoCSV, applyCSVtoMXE, applyCSVDIRtoMXE
+from .inventory import mxeInventory, printInventory, writeInventoryJSON
+from .stats import STATS
+
+# templates shipped with the tool, next to MxeReader.py
+DEFAULT_TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'VlMx_entry_templates.csv')
+
+def expandMXEPaths(paths: list) -> list:
+    """
+        Returns: list of mxe files from command line arguments.
+        Each argument can be an mxe file, a directory (all *.mxe in it are taken) or a glob pattern.
+        A file reached through several arguments is only taken once, at its first place.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, "*.mxe"))))
+        elif glob.has_magic(path):
+            found.extend(sorted(p for p in glob.glob(path) if os.path.splitext(p)[1] == ".mxe"))
+        else:
+            found.append(path)
+    result = []
+    seen = set()
+    for path in found:
+        real_path = os.path.realpath(path)
+        if real_path not in seen:
+            seen.add(real_path)
+            result.append(path)
+    return result
+
+def processMXE(mxe_path: str, mode: str, templates: TemplateRegistry, csv_directory: str, csv_path: str, xlb_path: str,
+               backup: bool = False, debug: bool = True, debug_log: str = "", use_mmap: bool = False, csv_workers: int = 1, atomic: bool = False,
+               use_cache: bool = False, include_types: list = None, exclude_types: list = None, inventory_json: str = None,
+               mxe_settings: dict = MXE_SETTINGS, output_modifiers: dict = OUTPUT_MODIFIERS) -> bool:
+    """
+        Runs one mode of the tool on one mxe file. Returns True if everything went fine.
+        Record types left out by include_types/exclude_types are neither read nor exported.
+    """
+    # TOC inventory, records and xlb are not touched
+    if mode=="I":
+        try:
+            print("Reading MXE TOC:" + mxe_path + "... ", end='')
+            main_table = readMXETOC(mxe_path, mxe_settings)
+            print("Done, total entry count is: " + str(len(main_table)))
+            inventory = [ row for row in mxeInventory(main_table, templates) if typeSelected(row["type"], include_types, exclude_types) ]
+            printInventory(inventory)
+            if inventory_json is not None:
+                writeInventoryJSON(inventory, inventory_json)
+        except:
+            print("Error:", sys.exc_info())
+            return False
+        return True
+
+    main_table = []
+    try:
+        print("Reading MXE file:" + mxe_path + "... ", end='')
+        main_table = readMXEFile(mxe_path, templates, mxe_settings, use_mmap, include_types, exclude_types)
+        print("Done")
+    except:
+        print("Error:", sys.exc_info())
+        print("Failed, exiting")
+        return False
+
+    if mode=="D":
+        # records are only read when used, so load them all here to check them
+        try:
+            print("Loading all records... ", end='')
+            with STATS.phase("loadRecords"):
+                for entries in main_table.types.values():
+                    loadEntries(entries)
+            print("Done")
+        except:
+            print("Error:", sys.exc_info())
+            return False
+        print("Dummy mode execution. This should be the last message you see.")
+
+    # write out CSVs
+    if mode=="R":
+        print("Writing data entries to directory: '" + csv_directory + "' ... ")
+        try:
+            writeMXEtoCSV(main_table, templates, csv_directory, xlb_path, mxe_settings, output_modifiers, csv_workers, use_cache, None, include_types, exclude_types)
+        except:
+            print("Error:", sys.exc_info())
+            return False
+        print("Done")
+
+    # apply CSV to MXE
+    if mode=="W" or mode=="T":
+        #apply directory
+        if(csv_directory != "" and csv_path == ""):
+            print("Applying CSV dir " + csv_directory + " to mxe in-memory")
+            try:
+                applyCSVDIRtoMXE(main_table,templates, csv_directory)
+            except:
+                print("Error:", sys.exc_info())
+                return False
+        #apply single CSV
+        if(csv_path != ""):
+            print("Applying single CSV " + csv_path + " to mxe in-memory")
+            try:
+                applyCSVtoMXE(main_table,templates, csv_path)
+            except:
+                print("Error:", sys.exc_info())
+                return False
+
+    # Write MXE out to the file
+    if mode=="W":
+        print("Writing data entries to mxe: '" + mxe_path)
+        try:
+            writeMXEFile(mxe_path, main_table, templates, mxe_settings, backup, debug, debug_log, atomic)
+        except:
+            print("Error:", sys.exc_info())
+            return False
+    return True
+
+"""
+    Batch mode: several mxe files are processed in a process pool.
+    Templates and settings are parsed once in the main process and handed to each worker when it starts.
+"""
+batch_templates = None
+batch_settings = None
+
+def initBatchWorker(templates: TemplateRegistry, mxe_settings: dict, output_modifiers: dict, stats_enabled: bool = False):
+    global batch_templates, batch_settings
+    batch_templates = templates
+    batch_settings = (mxe_settings, output_modifiers)
+    STATS.enabled = stats_enabled
+
+def runBatchJob(job: dict) -> tuple:
+    """
+        Returns: (mxe path, success, seconds taken, captured output, stats phases)
+    """
+    STATS.reset()
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        try:
+            ok = processMXE(templates=batch_templates, mxe_settings=batch_settings[0], output_modifiers=batch_settings[1], **job)
+        except:
+            print("Error:", sys.exc_info())
+            ok = False
+    return (job["mxe_path"], ok, time.perf_counter() - start, out.getvalue(), STATS.phases)
+
+def processMXEBatch(jobs: list, templates: TemplateRegistry, workers: int = None,
+                    mxe_settings: dict = MXE_SETTINGS, output_modifiers: dict = OUTPUT_MODIFIERS) -> list:
+    """
+        Runs processMXE for every job (dict of processMXE arguments except templates and settings) in a process pool.
+        Returns: list of (mxe path, success, seconds taken, captured output, stats phases) in the order of jobs
+        Stats of the workers are merged into stats of this process.
+    """
+    start = time.perf_counter()
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initBatchWorker, initargs=(templates, mxe_settings, output_modifiers, STATS.enabled)) as pool:
+        futures = [ pool.submit(runBatchJob, job) for job in jobs ]
+        for future in concurrent.futures.as_completed(futures):
+            res = future.result()
+            results[res[0]] = res
+            STATS.merge(res[4])
+            print(("Done: " if res[1] else "FAILED: ") + res[0] + " (" + "{:.2f}".format(res[2]) + "s)")
+    results = [ results[job["mxe_path"]] for job in jobs ]
+
+    print("Batch summary:")
+    for path, ok, seconds, output, _ in results:
+        print("  " + ("OK    " if ok else "FAILED") + " " + "{:8.2f}".format(seconds) + "s  " + path)
+        if not ok:
+            # show what went wrong, the rest of the output is not interesting
+            for line in output.splitlines()[-5:]:
+                print("          " + line)
+    ok_count = len([ r for r in results if r[1] ])
+    print("Processed " + str(len(results)) + " files in " + "{:.2f}".format(time.perf_counter() - start) + "s (" + str(ok_count) + " OK, " + str(len(results) - ok_count) + " failed)")
+    return results
+
+def writeStatsReport(stats_json: str, start_wall: float, start_cpu: float, mxe_count: int):
+    """
+        Writes phase timings and counters collected during the run to a json file
+    """
+    report = { "mxe_files": mxe_count, "total_wall_s": time.perf_counter() - start_wall, "total_cpu_s": time.process_time() - start_cpu }
+    report.update(STATS.report())
+    with open(stats_json, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Stats report written to: " + stats_json)
+
+def main():
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    parser = argparse.ArgumentParser(description="Script for reading and editing main MXE table for Valkyria Chronicles 4.", formatter_class=RawTextHelpFormatter)
+    parser.add_argument("mxe_path", type=str, nargs="+", help="MXE file. Several files, directories or glob patterns (e.g. \"F:\\test\\*.mxe\") can be given to process them all in batch mode.")
+    parser.add_argument("mode", choices=[ 'R', 'T', 'W', 'D', 'I' ], help="R: read mode - output MXE file to CSV\r\nT: test mode - apply CSV to MXE in-memory only\r\nW: write mode - apply CSV to MXE and write out the result.\r\nD: dummy mode, will only attempt to read templates and MXE into memory, loading and checking every record\r\nI: inventory mode - print record types found in main TOC with counts, address ranges and sizes, records and xlb are not read")
+    parser.add_argument("-t", "--template-csv-path", type=str, help="Path to a CSV file containing record templates.")
+    parser.add_argument("-d", "--csv-dir", type=str, help="Path to directory for CSV files. In this directory:\r\n  - Read mode will save CSV output\r\n  - Test and Write modes will look for files to apply to MXE\r\nThis will only be applied if -s is not specified\r\nIn batch mode, each MXE gets a subdirectory named after it.")
+    parser.add_argument("-s", "--single-csv", type=str, help="Path to a single CSV file. Test and Write modes will apply this one file to MXE.\r\nIf both -d and -s are specified, directory is applied first, and then single file on top")
+    parser.add_argument("-x", "--xlb-path", type=str, help="Path to xlb file with text data to resolve MXE text IDs into human-readable stuff, like character and weapon names. Only 'text_mx.xlb' is currently supported (with horrible hacks).")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Suppress debug logging write MXE mode")
+    parser.add_argument("-l", "--log", type=str, help="Path to a debug log file generated when writing MXE.")
+    parser.add_argument("-c", "--config-file", type=str, help="Path to configuration file. If omitted, hardcoded defaults are used.")
+    parser.add_argument("-b", "--backup-mxe", action="store_true", help="Back up MXE file when writing it out. Only used with W mode.")
+    parser.add_argument("-m", "--mmap", action="store_true", help="Memory-map MXE file instead of reading it into memory.")
+    parser.add_argument("-a", "--atomic", action="store_true", help="Write MXE to a temp file and rename it over the original instead of patching it in place.\r\nBackup (-b) is then a hardlink to the old file. Only used with W mode, can't be combined with -m.")
+    parser.add_argument("--cache", action="store_true", help="Use and create '<xlb>.idx' cache file next to XLB with XLB text index.\r\nCache is only reused while the XLB it was built from is unchanged.")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of worker processes in batch mode. Defaults to CPU count.")
+    parser.add_argument("-w", "--csv-workers", type=int, default=1, help="Number of worker processes writing per-record-type CSV files in read mode. Not used in batch mode.")
+    parser.add_argument("--include-types", type=str, help="Comma-separated record types to work on, e.g. \"VlMxWeaponInfo,VlMxJobInfo\". Other types are not read, exported or written.")
+    parser.add_argument("--exclude-types", type=str, help="Comma-separated record types to leave out. Applied after --include-types.")
+    parser.add_argument("--inventory-json", type=str, help="Also write inventory (I mode) to this JSON file. In batch mode, mxe name is appended to file name.")
+    parser.add_argument("--stats-json", type=str, help="Write wall/CPU time and counters (bytes read/written, seeks, string resolutions, xlb lookups, records)\r\nof every phase to this JSON file.")
+
+    args = parser.parse_args()
+    STATS.enabled = args.stats_json is not None
+
+    mxe_paths = expandMXEPaths(args.mxe_path)
+    if len(mxe_paths) == 0:
+        print("Error: no mxe files found")
+        sys.exit(1)
+    for mxe_path in mxe_paths:
+        if os.path.isdir(mxe_path) or os.path.splitext(mxe_path)[1] != ".mxe":
+            print("Error: specified mxe path is a directory or not an mxe file: " + mxe_path)
+            sys.exit(1)
+    batch = len(mxe_paths) > 1
+    if args.mmap and args.atomic:
+        print("Error: -m/--mmap can't be used together with -a/--atomic, a memory-mapped file can't be replaced on Windows")
+        sys.exit(1)
+
+    if args.config_file is None:
+        print("No config file specified, using defaults")
+    else:
+        print("Applying config file: " + args.config_file)
+        applyConfigFile(args.config_file)
+
+    if args.template_csv_path is None:
+        template_path=DEFAULT_TEMPLATE_PATH
+        print("No template specified, defaulting to: " + template_path)
+    else:
+        template_path = args.template_csv_path
+
+    csv_path = ""
+    if args.single_csv is not None:
+        csv_path = args.single_csv
+        print("Single CSV path specified: " + args.single_csv)
+
+    include_types = None
+    if args.include_types is not None:
+        include_types = [ t.strip() for t in args.include_types.split(",") if t.strip() != "" ]
+        print("Only record types: " + ", ".join(include_types))
+    exclude_types = None
+    if args.exclude_types is not None:
+        exclude_types = [ t.strip() for t in args.exclude_types.split(",") if t.strip() != "" ]
+        print("Excluding record types: " + ", ".join(exclude_types))
+
+    debug = True
+    if args.quiet:
+        debug = False
+    """
+        Read templates
+    """
+    templates = TemplateRegistry()
+    try:
+        print("Reading templates from file: " + template_path + "... ", end='')
+        templates = readTemplates(template_path)
+        print("Done")
+    except FileNotFoundError:
+        print("Error: template file '" + template_path + "' was not found at specfied path.")
+        sys.exit(1)
+
+    jobs = []
+    for mxe_path in mxe_paths:
+        if args.csv_dir is None:
+            csv_directory=os.path.splitext(mxe_path)[0]
+            if not batch: print("No CSV directory specified, defaulting to: " + csv_directory)
+        elif batch:
+            csv_directory = os.path.join(args.csv_dir, os.path.splitext(os.path.basename(mxe_path))[0])
+        else:
+            csv_directory = args.csv_dir
+            print("CSV directory specified: " + csv_directory)
+
+        if args.xlb_path is None:
+            xlb_path=os.path.join(os.path.dirname(mxe_path),'text_mx.xlb')
+            if not batch: print("No XLB path specified, defaulting to: " + xlb_path)
+        else:
+            xlb_path = args.xlb_path
+
+        if args.log is not None:
+            debug_log = args.log if not batch else os.path.splitext(args.log)[0] + "_" + os.path.splitext(os.path.basename(mxe_path))[0] + os.path.splitext(args.log)[1]
+        elif batch:
+            # workers run at the same time, so each one gets its own log
+            debug_log=os.path.splitext(mxe_path)[0] + '_write_log.txt'
+        else:
+            debug_log=os.path.join(os.path.dirname(mxe_path),'write_log.txt')
+            print("No log path specified, defaulting to: " + debug_log)
+
+        inventory_json = args.inventory_json
+        if inventory_json is not None and batch:
+            inventory_json = os.path.splitext(args.inventory_json)[0] + "_" + os.path.splitext(os.path.basename(mxe_path))[0] + os.path.splitext(args.inventory_json)[1]
+
+        jobs.append({ "mxe_path": mxe_path, "mode": args.mode, "csv_directory": csv_directory, "csv_path": csv_path, "xlb_path": xlb_path,
+                      "backup": args.backup_mxe, "debug": debug, "debug_log": debug_log, "use_mmap": args.mmap, "atomic": args.atomic, "use_cache": args.cache,
+                      "include_types": include_types, "exclude_types": exclude_types, "inventory_json": inventory_json,
+                      # batch workers are already running in parallel, they write their CSVs one by one
+                      "csv_workers": 1 if batch else args.csv_workers })
+
+    ok = True
+    if not batch:
+        ok = processMXE(templates=templates, **jobs[0])
+    else:
+        print("Batch mode: " + str(len(jobs)) + " mxe files")
+        results = processMXEBatch(jobs, templates, args.jobs)
+        ok = all(res[1] for res in results)
+    if args.stats_json is not None:
+        writeStatsReport(args.stats_json, start_wall, start_cpu, len(jobs))
+    if not ok:
+        sys.exit(1)
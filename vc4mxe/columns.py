@@ -0,0 +1,156 @@
+"""
+    Columnar view of all records of one type: every numeric field held in one array instead of a value per record,
+    for compact storage and whole-column operations. NumPy arrays are used when NumPy is installed, array.array otherwise.
+"""
+import array
+import struct
+
+from .records import RecordLayout
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""
+    Datatype->array.array typecode of numeric fields. Big-endian fields end up in native order too.
+"""
+ColumnTypecodes = {
+    "<i": "i",
+    "<i2": "h",
+    "<f": "f",
+    ">i": "i",
+    ">i2": "h",
+    ">f": "f",
+    "i1": "b"
+}
+
+"""
+    Datatype->NumPy dtype of numeric and pointer fields
+"""
+ColumnDtypes = {
+    "<i": "<i4",
+    "<i2": "<i2",
+    "<f": "<f4",
+    ">i": ">i4",
+    ">i2": ">i2",
+    ">f": ">f4",
+    "i1": "i1",
+    "<ip": "<i4",
+    "<pi": "<i4",
+    "<p": "<i4",
+    ">ip": ">i4",
+    ">pi": ">i4",
+    ">p": ">i4"
+}
+
+PointerDataTypes = [ "<ip", "<pi", "<p", ">ip", ">pi", ">p" ]
+
+class RecordColumns:
+    """
+        Fields of all given entries (of one record type) stored column by column, in the order of entries:
+            columns  - field index -> array of numeric values (<i, <i2, <f, i1 and their big-endian versions)
+            pointers - field index -> array of raw pointer values (addresses, or xlb ids for <ip), kept apart as they aren't plain numbers
+        Hex fields are not included. Columns can be changed in place and written back to the records with store().
+        Raises ValueError if some of entries have no record data (type without template, or filtered out when reading mxe).
+    """
+    def __init__(self, layout: RecordLayout, entries: list, use_numpy: bool = True):
+        if layout is None or any(entry.data is None for entry in entries):
+            raise ValueError("Columns need record data of every entry, record type has no template or was filtered out when reading mxe")
+        self.layout = layout
+        self.entries = entries
+        self.numpy = use_numpy and numpy is not None
+        self.columns = {}
+        self.pointers = {}
+        # all records back to back, so fields can be cut out with one pass per byte order
+        buf = b"".join(entry.data.view for entry in entries)
+        if self.numpy:
+            self.readNumpy(buf)
+        else:
+            self.readArrays(buf)
+
+    def readNumpy(self, buf: bytes):
+        indexes = [ i for i, dt in enumerate(self.layout.types) if dt in ColumnDtypes ]
+        dtype = numpy.dtype({ "names": [ "f" + str(i) for i in indexes ],
+                              "formats": [ ColumnDtypes[self.layout.types[i]] for i in indexes ],
+                              "offsets": [ self.layout.offsets[i] for i in indexes ],
+                              "itemsize": self.layout.size })
+        records = numpy.frombuffer(buf, dtype=dtype)
+        for i in indexes:
+            # native byte order copy, writable and independent of the records
+            column = records["f" + str(i)].astype(records.dtype["f" + str(i)].newbyteorder("="))
+            if self.layout.types[i] in PointerDataTypes:
+                self.pointers[i] = column
+            else:
+                self.columns[i] = column
+
+    def readArrays(self, buf: bytes):
+        for order in [ "<", ">" ]:
+            # one struct per byte order, other fields are skipped as padding
+            codes = []
+            indexes = []
+            for i, dt in enumerate(self.layout.types):
+                size = self.layout.sizes[i]
+                if (dt in ColumnTypecodes or dt in PointerDataTypes) and (dt.startswith(order) or (dt == "i1" and order == "<")):
+                    codes.append(ColumnTypecodes.get(dt, "i"))
+                    indexes.append(i)
+                else:
+                    codes.append(str(size) + "x")
+            if not indexes or not buf:
+                continue
+            values = zip(*struct.iter_unpack(order + "".join(codes), buf))
+            for i, column in zip(indexes, values):
+                if self.layout.types[i] in PointerDataTypes:
+                    self.pointers[i] = array.array("i", column)
+                else:
+                    self.columns[i] = array.array(ColumnTypecodes[self.layout.types[i]], column)
+        if not buf:
+            for i, dt in enumerate(self.layout.types):
+                if dt in PointerDataTypes:
+                    self.pointers[i] = array.array("i")
+                elif dt in ColumnTypecodes:
+                    self.columns[i] = array.array(ColumnTypecodes[dt])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def field(self, name: str) -> int:
+        """
+            Returns: index of the first field with template name <name>, or None
+        """
+        for i, (_, field_name) in enumerate(self.layout.fields):
+            if field_name == name:
+                return i
+        return None
+
+    def column(self, field):
+        """
+            Returns: numeric or pointer column by field index or template field name
+        """
+        i = field if isinstance(field, int) else self.field(field)
+        if i in self.columns:
+            return self.columns[i]
+        return self.pointers[i]
+
+    def nbytes(self) -> int:
+        """
+            Returns: memory taken by column data
+        """
+        return sum(column.nbytes if self.numpy else column.itemsize * len(column) for column in list(self.columns.values()) + list(self.pointers.values()))
+
+    def store(self) -> int:
+        """
+            Writes numeric columns back into the records. Goes through record item assignment, so only fields
+            whose bytes actually changed end up dirty. Pointer columns are read-only, same as pointers in CSV apply.
+            Returns: number of records changed by this call
+        """
+        changed = set()
+        for i, column in self.columns.items():
+            dt = self.layout.types[i]
+            field = struct.Struct((">" if dt.startswith(">") else "<") + ColumnTypecodes[dt])
+            for n, (entry, value) in enumerate(zip(self.entries, column)):
+                raw = field.pack(value)
+                if entry.data.raw(i) != raw:
+                    entry.data[i] = raw
+                    changed.add(n)
+        return len(changed)
@@ -0,0 +1,223 @@
+"""
+    CSV export of MXE records and applying edited CSVs back to in-memory MXE
+"""
+import os
+import csv
+import concurrent.futures
+
+from .settings import MXE_SETTINGS, OUTPUT_MODIFIERS
+from .datatypes import bytesAsBEHex, bytesToText, objToBytes
+from .records import RecordLayout
+from .templates import TemplateRegistry, typeName, typeSelected
+from .xlb import XlbData, findByIDInXLB, loadXLB, xlbFixes
+from .reader import MainTable, loadEntries
+from .stats import STATS, timedPhase
+
+def xlbText(xlb_list: XlbData, id: int) -> str:
+    """
+        Returns: xlb string for id as CSV text, empty string if there is none
+    """
+    res = findByIDInXLB(xlb_list, id)
+    if res != '' and res != None:
+        return bytesToText(res, "s").replace("\n", "\\LF")
+    return ""
+
+def xlbPointerCell(val: bytes, xlb_list: XlbData):
+    """
+        Returns: CSV cell for a resolved xlb pointer. Pointed-to text is usually an xlb id,
+        which is output as is if xlb_list is None, and resolved through xlb otherwise.
+        Anything that isn't a number is output as text.
+    """
+    if val == b'':
+        return ""
+    try:
+        id = int(val)
+    except ValueError:
+        return bytesToText(val, "s").replace("\n", "\\LF")
+    if xlb_list is None:
+        return id
+    return xlbText(xlb_list, id)
+
+def buildColumnConverters(layout: RecordLayout, xlb_list: XlbData, mxe_settings: dict = MXE_SETTINGS, output_modifiers: dict = OUTPUT_MODIFIERS) -> list:
+    """
+        Returns: list with a converter for every layout field, converter(record: RecordData, values: list) -> CSV cell
+        All output modifier and resolve setting checks are done here once per record type, not for every field of every row.
+    """
+    converters = []
+    for i, dt in enumerate(layout.types):
+        # default: decoded value as is
+        conv = lambda rec, vals, i=i: vals[i]
+        if output_modifiers.get("FORCE_HEX_OUTPUT"):
+            conv = lambda rec, vals, i=i: bytesAsBEHex(rec.raw(i))
+        # classic pointer
+        elif dt == "<p" or dt == ">p":
+            if not output_modifiers.get("FORCE_RAW_CLASSIC_POINTERS") and mxe_settings.get("RESOLVE_CLASSIC_POINTERS"):
+                conv = lambda rec, vals, i=i: rec.resolved[i]
+        # xlb pointer
+        elif dt == "<pi" or dt == ">pi":
+            if not output_modifiers.get("FORCE_RAW_XLB_POINTERS") and mxe_settings.get("RESOLVE_XLB_POINTERS"):
+                if not mxe_settings.get("RESOLVE_XLB_STRINGS"):
+                    conv = lambda rec, vals, i=i: bytesToText(rec.resolved[i], "s").replace("\n", "\\LF")
+                elif output_modifiers.get("FORCE_XLB_IDS"):
+                    conv = lambda rec, vals, i=i: xlbPointerCell(rec.resolved[i], None)
+                else:
+                    conv = lambda rec, vals, i=i: xlbPointerCell(rec.resolved[i], xlb_list)
+        #direct xlb ID
+        elif dt == "<ip" or dt == ">ip":
+            if mxe_settings.get("RESOLVE_XLB_STRINGS"):
+                conv = lambda rec, vals, i=i: xlbText(xlb_list, vals[i])
+        converters.append(conv)
+    return converters
+
+def writeRecordTypeCSV(out_csv_file: str, template: list, layout: RecordLayout, entries: list, xlb_list: XlbData, mxe_settings: dict = MXE_SETTINGS, output_modifiers: dict = OUTPUT_MODIFIERS):
+    """
+        Writes CSV file with all entries of one record type
+    """
+    with open(out_csv_file, 'w', newline='', encoding='shift-jisx0213') as out_csv:
+        writer = csv.writer(out_csv, delimiter=',', quotechar='"')
+        # write template to 1st row
+        row = [ 'RecordId', 'InternalName' ]
+        for t in template[1]:
+            if (t[1] == ''):
+                row.append(t[0])
+            else:
+                row.append(t[0]+":"+t[1])
+        writer.writerow(row)
+        # write data entries
+        converters = buildColumnConverters(layout, xlb_list, mxe_settings, output_modifiers)
+        # whole records are decoded at once, pointers are decoded to addresses
+        for entry, values in zip(entries, loadEntries(entries)):
+            record = entry.data
+            writer.writerow([ entry.id, entry.type_string ] + [ conv(record, values) for conv in converters ])
+    STATS.count("records", len(entries))
+    STATS.count("bytes_written", os.path.getsize(out_csv_file))
+
+"""
+    Parallel CSV export: every record type CSV depends only on its own entries and the read-only xlb,
+    so they can be written by a process pool. xlb and settings are sent to each worker once when it starts.
+"""
+csv_worker_state = None
+
+def initCSVWorker(xlb_list: XlbData, mxe_settings: dict, output_modifiers: dict, stats_enabled: bool = False):
+    global csv_worker_state
+    csv_worker_state = (xlb_list, mxe_settings, output_modifiers)
+    STATS.enabled = stats_enabled
+
+def runCSVJob(out_csv_file: str, template: list, layout: RecordLayout, entries: list) -> dict:
+    """
+        Returns: stats phases collected while writing this CSV, merged into the main process stats
+    """
+    STATS.reset()
+    with STATS.phase("writeMXEtoCSV"):
+        writeRecordTypeCSV(out_csv_file, template, layout, entries, *csv_worker_state)
+    return STATS.phases
+
+@timedPhase("writeMXEtoCSV")
+def writeMXEtoCSV(main_table: MainTable, templates: TemplateRegistry, out_csv_directory: str, xlb_path: str, mxe_settings: dict = MXE_SETTINGS, output_modifiers: dict = OUTPUT_MODIFIERS, workers: int = 1, use_cache: bool = False, xlb_list = None,
+                  include_types: list = None, exclude_types: list = None):
+    """
+        Writes a CSV file per record type to out_csv_directory.
+        With workers > 1, CSV files are rendered and written concurrently by that many worker processes.
+        With use_cache set, xlb ids are resolved through memory-mapped xlb index cache, see loadXLB.
+        Already loaded xlb (XlbData or XlbIndex) can be passed as xlb_list, xlb_path is not read then.
+        Only record types passing include_types/exclude_types get a CSV, see typeSelected.
+    """
+    # check/create directory
+    if not os.path.exists(out_csv_directory):
+        os.makedirs(out_csv_directory)
+
+    # read xlb for name resolution if needed and not loaded by the caller already
+    if xlb_list is None and mxe_settings.get("RESOLVE_XLB_STRINGS"):
+        xlb_list = loadXLB(xlb_path, xlbFixes(xlb_path), use_cache)
+
+    # record types actually found in data
+    jobs = []
+    for templ_name, entries in main_table.types.items():
+        if not typeSelected(templ_name, include_types, exclude_types):
+            continue
+        template = templates.find(templ_name)
+        if template is None:
+            #print("No templates found for record type: " + templ_name + ". No CSV will be written")
+            print("Template not found for: '", end='')
+            print(templ_name.encode('shift_jisx0213'), end = '')
+            print(". No CSV will be written")
+            continue
+        out_csv_file = os.path.join(out_csv_directory, templ_name + ".csv")
+        jobs.append((out_csv_file, template, templates.layout(templ_name), entries))
+
+    if workers is None or workers <= 1:
+        for job in jobs:
+            writeRecordTypeCSV(*job, xlb_list, mxe_settings, output_modifiers)
+        return
+
+    # entries are pickled with their records, so each type is loaded here in bulk rather than record by record while pickling
+    for job in jobs:
+        loadEntries(job[3], decode=False)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initCSVWorker, initargs=(xlb_list, mxe_settings, output_modifiers, STATS.enabled)) as pool:
+        # biggest types first, so a large one doesn't start last and hold up the whole export
+        futures = [ pool.submit(runCSVJob, *job) for job in sorted(jobs, key=lambda job: len(job[3]), reverse=True) ]
+        for future in concurrent.futures.as_completed(futures):
+            # re-raises errors from workers
+            STATS.merge(future.result(), wall=False)
+
+@timedPhase("applyCSVtoMXE")
+def applyCSVtoMXE(main_table: MainTable, templates: TemplateRegistry, csv_path: str)-> MainTable:
+    print("Processing csv file: " + csv_path)
+    STATS.count("bytes_read", os.path.getsize(csv_path))
+    with open(csv_path, newline='', encoding='shift-jisx0213') as in_csv:
+        reader = csv.reader(in_csv, delimiter=',', quotechar='"')
+        header_row = []
+        template = []
+        records = {}
+
+        for row in reader:
+            if reader.line_num == 1:
+                #process header line
+                if row[0] != "RecordId" or row[1] != "InternalName":
+                    print("Error: expected first columns: 'RecordId,InternalName', found: '" + row[0] + "," + row[1] +"'")
+                    return
+                header_row = [ tuple(x.split(':',1)) if ":" in x else (x, '') for x in row[2:]]
+            else:
+                # find template
+                if reader.line_num == 2:
+                    template = templates.find(typeName(row[1]))
+                    if template is None:
+                        print("Template not found for: '" + typeName(row[1]) + "', CSV file will be skipped")
+                        return main_table
+                    # entries of this type by id, only records listed in CSV get loaded
+                    records = { e.id: e for e in main_table.types.get(template[0], []) }
+                    if records and next(iter(records.values())).data is None:
+                        print("Record type '" + template[0] + "' was filtered out when reading mxe, CSV file will be skipped")
+                        return main_table
+                #find record
+                entry = records.get(int(row[0]))
+                if entry is None:
+                    print("CSV idx=" + str(row[0]) + ": not found in mxe main table and will be skipped")
+                    continue
+                entry = entry.data
+                STATS.count("records")
+                i = 0
+                for (dt, _) in template[1]:
+                    try:
+                        if header_row[i][0] != dt:
+                            print("CSV idx=" + str(row[0]) + ": skipping mismatched datatype - template=" + dt + "; csv header=" + header_row[i][0])
+                        else:
+                            if dt == "<p" or dt == ">p" or dt == "<pi" or dt == ">pi" or dt == "<ip" or dt == ">ip":
+                                #print("CSV idx=" + str(row[0]) + ", col=" + str(i) + ": pointer datatype, skipping")
+                                a=1
+                            else:
+                                b = objToBytes(row[2+i], dt)
+                                if entry[i] != b:
+                                    print("CSV idx=" + str(row[0]) + ", col=" + str(i) + ": changing value '" + str(entry[i]) + "' -> '" + str(b) + "'")
+                                    entry[i] = b
+                    except IndexError:
+                        print("CSV idx=" + str(row[0]) + ": template " + template[0] + " has more fields than real data, error at column " + str(i))
+                    i += 1
+    return main_table
+
+def applyCSVDIRtoMXE(main_table: MainTable, templates: TemplateRegistry, csv_dir: str):
+    print("Processing location: " + csv_dir)
+    file_names = [fn for fn in os.listdir(csv_dir) if fn.endswith(".csv")]
+    print("Found csv files: " + str(len(file_names)))
+    for csv_path in file_names:
+        applyCSVtoMXE(main_table, templates, os.path.join(csv_dir, csv_path))
@@ -0,0 +1,240 @@
+"""
+    Field data types used in record templates and converters between field bytes and CSV text
+"""
+import struct
+import codecs
+
+""" ---------------------------------------------------"""
+"""              Data types, converters                """
+""" ---------------------------------------------------"""
+
+"""
+    Datatype->length of record in bytes
+    These are used in templates to describe record structure.
+"""
+DataTypes = {
+    "<i": 4,  # int
+    "<i2": 2, # short int
+    "<f": 4,  # float
+    "<h": 4,  # hex-as-string sequence (e.g. 0x12-34-ab-cd)
+
+    ">i": 4,  # big-endian int
+    ">i2": 2, # big-endian short int
+    ">f": 4,  # big-endian float
+    ">h": 4,  # big-endian hex-as-string sequence (e.g. 0x12-34-ab-cd)
+
+    "i1": 1, # char (1-byte integer)
+
+    "<ip": 4, # direct id from xlb text container file (external/player-visible text is sometimes this)
+    "<pi": 4, # address of string with id from xlb text container file (external/player-visible text is usually this)
+    "<p": 4,   # address of string with text in mxe (usually internal text in VC4)
+
+    ">ip": 4, # big-endian direct id from xlb text container file
+    ">pi": 4, # big-endian address of string with id from xlb text container file 
+    ">p": 4   # big-endian address of string with text in mxe
+}
+
+"""
+    Converter wrapper functions from bytes datatype
+"""
+def bytesAsLEInt(buf):
+    return struct.unpack_from("<i", buf, 0)[0]
+
+def bytesAsLEShort(buf):
+    return struct.unpack_from("<h", buf, 0)[0]
+
+def bytesAsChar(buf):
+    return struct.unpack_from("<b", buf, 0)[0]
+
+def bytesAsBEInt(buf):
+    return struct.unpack_from(">i", buf, 0)[0]
+
+def bytesAsBEShort(buf):
+    return struct.unpack_from(">h", buf, 0)[0]
+
+# Strictly speaking, rounding like this is bad and data loss but it's only barely ever relevant if doing unit placement.... maybe...
+# Most values in float have no actual partial value. There are also occasionally very small (<0.001) values in places 
+# where game engine surely uses 0 (like anti-accuracy field in weapon records). 
+# For practical purposes, it's perfectly fine to just return round to 2 digits, although ability to rebuild original MXE 1-to-1 is lost this way
+def bytesAsLEFloat(buf):
+    # res = struct.unpack_from("<f", buf, 0)[0]
+    # if res < 0.01:
+    #     return res
+    # else:
+    #     return round(res,2)
+    return round(struct.unpack_from("<f", buf, 0)[0],2)
+    #return struct.unpack_from("<f", buf, 0)[0]
+
+# see comment above
+def bytesAsBEFloat(buf):
+    # res = struct.unpack_from(">f", buf, 0)[0]
+    # if res < 0.01:
+    #     return res
+    # else:
+    #     return round(res,2)
+    return round(struct.unpack_from(">f", buf, 0)[0],2)
+    #struct.unpack_from(">f", buf, 0)[0]
+
+def bytesAsLEHex(buf):
+    s = '0x'
+    for byte in reversed(buf):
+        s += hex(byte)[2:].zfill(2).upper() + "-"
+    return s[:-1]
+
+def bytesAsBEHex(buf):
+    s = '0x'
+    for byte in buf:
+        s += hex(byte)[2:].zfill(2).upper() + "-"
+    return s[:-1]  
+
+def bytesAsLEAddress(buf):
+    return bytesAsLEInt(buf)
+
+def bytesAsBEAddress(buf):
+    return bytesAsBEInt(buf)
+
+def bytesAsString(buf, enc: str = 'shift_jisx0213'):
+    return buf.decode(enc).rstrip('\x00')
+
+"""
+    Converter wrapper functions to bytes
+"""
+def leIntAsBytes(obj):
+    return struct.pack("<i", int(obj))
+
+def leShortAsBytes(obj):
+    return struct.pack("<h", int(obj))
+
+def charAsBytes(obj):
+    return struct.pack("<b", int(obj))
+
+def beIntAsBytes(obj):
+    return struct.pack(">i", int(obj))
+
+def beShortAsBytes(obj):
+    return struct.pack(">h", int(obj))
+
+def leFloatAsBytes(obj):
+    return struct.pack("<f", float(obj))
+
+def beFloatAsBytes(obj):
+    return struct.pack(">f", float(obj))
+
+def leHexAsBytes(obj):
+    b = str(obj).replace('-', '').replace('0x', '')
+    c = struct.unpack("<i", codecs.decode(b, "hex"))[0]
+    return struct.pack("<i", c)
+
+def beHexAsBytes(obj):
+    b = str(obj).replace('-', '').replace('0x', '')
+    c = struct.unpack(">i", codecs.decode(b, "hex"))[0]
+    return struct.pack(">i", c)
+
+def leAddressAsBytes(obj):
+    return leIntAsBytes(obj)
+
+def beAddressAsBytes(obj):
+    return beIntAsBytes(obj)
+
+def stringAsBytes(obj: str, enc: str = 'shift_jisx0213'):
+    return obj.encode(enc)
+
+"""
+    map dataTypes->converter functions
+"""
+ConvertFunctions = {
+    "<i": bytesAsLEInt,
+    "<i2": bytesAsLEShort,
+    "<f": bytesAsLEFloat,
+    "<h": bytesAsLEHex,
+    
+    ">i": bytesAsBEInt,
+    ">i2": bytesAsBEShort,
+    ">f": bytesAsBEFloat,
+    ">h": bytesAsBEHex,
+
+    "i1": bytesAsChar,
+
+    "<ip": bytesAsLEAddress,
+    "<pi": bytesAsLEAddress,
+    "<p": bytesAsLEAddress,
+
+    ">ip": bytesAsBEAddress,
+    ">pi": bytesAsBEAddress,
+    ">p": bytesAsBEAddress,
+
+    "s": bytesAsString
+}
+
+ConvertBackFunctions = {
+    "<i": leIntAsBytes,
+    "<i2": leShortAsBytes,
+    "<f": leFloatAsBytes,
+    "<h": leHexAsBytes,
+    
+    ">i": beIntAsBytes,
+    ">i2": beShortAsBytes,
+    ">f": beFloatAsBytes,
+    ">h": beHexAsBytes,
+
+    "i1": charAsBytes,
+
+    "<ip": leAddressAsBytes,
+    "<pi": leAddressAsBytes,
+    "<p": leAddressAsBytes,
+
+    ">ip": beAddressAsBytes,
+    ">pi": beAddressAsBytes,
+    ">p": beAddressAsBytes,
+
+    "s": stringAsBytes
+}
+
+"""
+    Converter wrapper that autoselects based on desired datatype from ConvertFunctions
+    There's no way to pass a different string encoding because there's no point, shift_jisx0213 works for all files I tried
+"""
+def bytesToText(buf, dataType: str):
+    func = ConvertFunctions.get(dataType)
+    if func != None:
+        return func(buf)
+    else:
+        return None
+
+def objToBytes(obj, dataType: str)->bytes:
+    func = ConvertBackFunctions.get(dataType)
+    if func != None:
+        return func(obj)
+    else:
+        return None
+
+"""
+    Datatype->struct format code used by compiled record layouts.
+    A struct format can only have one byte order, so big-endian and hex fields are unpacked
+    as raw bytes and converted afterwards with their ConvertFunctions.
+"""
+StructCodes = {
+    "<i": "i",
+    "<i2": "h",
+    "<f": "f",
+    "<h": "4s",
+
+    ">i": "4s",
+    ">i2": "2s",
+    ">f": "4s",
+    ">h": "4s",
+
+    "i1": "b",
+
+    "<ip": "i",
+    "<pi": "i",
+    "<p": "i",
+
+    ">ip": "4s",
+    ">pi": "4s",
+    ">p": "4s"
+}
+
+def roundFloat(value: float) -> float:
+    # same rounding as bytesAsLEFloat/bytesAsBEFloat, see comment there
+    return round(value, 2)
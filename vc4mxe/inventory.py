@@ -0,0 +1,57 @@
+"""
+    Inventory of main TOC: what record types an mxe has, how many and where, without reading records or xlb
+"""
+import json
+
+from .templates import TemplateRegistry
+from .reader import MainTable, followAddress
+
+def mxeInventory(main_table: MainTable, templates: TemplateRegistry) -> list:
+    """
+        Returns: [ { "type", "count", "first_address", "last_address", "template_size", "estimated_size" } ] per record type in TOC order.
+        Addresses are file offsets. template_size is None for types without template.
+        Records are not read: estimated_size is the most common distance from a record of the type to the next record in the file,
+        None if there is nothing to measure (single record at the end of the file).
+    """
+    addresses = sorted(set(followAddress(entry.address) for entry in main_table))
+    next_address = { address: addresses[k + 1] for k, address in enumerate(addresses[:-1]) }
+    inventory = []
+    for type_name, entries in main_table.types.items():
+        starts = [ followAddress(entry.address) for entry in entries ]
+        gaps = {}
+        for start in starts:
+            if start in next_address:
+                gap = next_address[start] - start
+                gaps[gap] = gaps.get(gap, 0) + 1
+        layout = templates.layout(type_name)
+        inventory.append({
+            "type": type_name,
+            "count": len(entries),
+            "first_address": min(starts),
+            "last_address": max(starts),
+            "template_size": layout.size if layout is not None else None,
+            "estimated_size": max(gaps, key=lambda gap: (gaps[gap], -gap)) if gaps else None
+        })
+    return inventory
+
+def printInventory(inventory: list):
+    """
+        Prints inventory as a table. Types where template size doesn't fit estimated size are marked with '!'
+    """
+    print("{:<40} {:>7} {:>10} {:>10} {:>8} {:>8}".format("type", "count", "first", "last", "template", "est.size"))
+    for row in inventory:
+        template = "-" if row["template_size"] is None else str(row["template_size"])
+        estimated = "?" if row["estimated_size"] is None else str(row["estimated_size"])
+        # records are 4-aligned, so a template a few bytes short of the distance is fine, only a longer one is suspicious
+        mismatch = row["template_size"] is not None and row["estimated_size"] is not None and row["template_size"] > row["estimated_size"]
+        print("{:<40} {:>7} {:>10} {:>10} {:>8} {:>8}{}".format(row["type"], row["count"], hex(row["first_address"]), hex(row["last_address"]),
+                                                              template, estimated, " !" if mismatch else ""))
+    covered = sum(row["count"] for row in inventory if row["template_size"] is not None)
+    total = sum(row["count"] for row in inventory)
+    print("Record types: " + str(len(inventory)) + ", with templates: " + str(len([ row for row in inventory if row["template_size"] is not None ]))
+          + "; entries: " + str(total) + ", with templates: " + str(covered))
+
+def writeInventoryJSON(inventory: list, json_path: str):
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(inventory, f, indent=2, ensure_ascii=False)
+    print("Inventory written to: " + json_path)
@@ -0,0 +1,86 @@
+"""
+    MxeFile: one MXE file with its parsed main table, for using the tool as a library
+"""
+from .settings import MXE_SETTINGS, OUTPUT_MODIFIERS
+from .templates import TemplateRegistry, typeSelected
+from .reader import MainTable, readMXEFile
+from .writer import writeMXEFile
+from .csvio import writeMXEtoCSV, applyCSVtoMXE, applyCSVDIRtoMXE
+from .columns import RecordColumns
+
+class MxeFile:
+    """
+        Parsed MXE file. Templates (and xlb for CSV export) are loaded by the caller and passed in,
+        so a long-running process can keep them in memory and reuse them for any number of files:
+
+            templates = readTemplates("VlMx_entry_templates.csv")
+            xlb = loadXLB("text_mx.xlb", use_cache=True)
+            mxe = MxeFile("game_info.mxe", templates)
+            mxe.applyCSV("VlMxWeaponInfo.csv")
+            mxe.write()
+            mxe.writeCSV("game_info", xlb_list=xlb)
+    """
+    def __init__(self, path: str, templates: TemplateRegistry, mxe_settings: dict = MXE_SETTINGS, use_mmap: bool = False,
+                 include_types: list = None, exclude_types: list = None):
+        self.path = path
+        self.templates = templates
+        self.mxe_settings = mxe_settings
+        # record types left out by these have no data and get no CSV
+        self.include_types = include_types
+        self.exclude_types = exclude_types
+        self.main_table: MainTable = readMXEFile(path, templates, mxe_settings, use_mmap, include_types, exclude_types)
+
+    def __len__(self):
+        return len(self.main_table)
+
+    def __iter__(self):
+        return iter(self.main_table)
+
+    def entries(self, type_name: str) -> list:
+        """
+            Returns: main table entries of record type in TOC order, empty list if there are none
+        """
+        return self.main_table.types.get(type_name, [])
+
+    def columns(self, type_name: str, use_numpy: bool = True) -> RecordColumns:
+        """
+            Returns: columnar view of all records of type, see RecordColumns. Call its store() to write changed columns back:
+
+                weapons = mxe.columns("VlMxWeaponInfo")
+                price = weapons.column("Price")
+                for k in range(len(price)):
+                    price[k] *= 2
+                weapons.store()
+                mxe.write()
+        """
+        layout = self.templates.layout(type_name)
+        if layout is None:
+            raise ValueError("Template not found for: " + type_name)
+        if not typeSelected(type_name, self.include_types, self.exclude_types):
+            raise ValueError("Record type was filtered out when reading mxe: " + type_name)
+        return RecordColumns(layout, self.entries(type_name), use_numpy)
+
+    def applyCSV(self, csv_path: str):
+        """
+            Applies single CSV file to in-memory records, see applyCSVtoMXE
+        """
+        applyCSVtoMXE(self.main_table, self.templates, csv_path)
+
+    def applyCSVDir(self, csv_dir: str):
+        """
+            Applies every CSV file in directory to in-memory records, see applyCSVDIRtoMXE
+        """
+        applyCSVDIRtoMXE(self.main_table, self.templates, csv_dir)
+
+    def writeCSV(self, out_csv_directory: str, xlb_path: str = "", xlb_list = None, output_modifiers: dict = OUTPUT_MODIFIERS, workers: int = 1, use_cache: bool = False):
+        """
+            Writes a CSV file per record type, see writeMXEtoCSV. Pass loaded xlb_list to skip reading xlb_path.
+        """
+        writeMXEtoCSV(self.main_table, self.templates, out_csv_directory, xlb_path, self.mxe_settings, output_modifiers, workers, use_cache, xlb_list,
+                      self.include_types, self.exclude_types)
+
+    def write(self, backup: bool = False, debug: bool = False, debug_log: str = "", atomic: bool = False):
+        """
+            Writes changed records back to the file, see writeMXEFile
+        """
+        writeMXEFile(self.path, self.main_table, self.templates, self.mxe_settings, backup, debug, debug_log, atomic)
@@ -0,0 +1,388 @@
+"""
+    MXE reading: main TOC, records and strings they point to
+"""
+import mmap
+import struct
+import codecs
+
+from .settings import MXE_SETTINGS
+from .records import RecordLayout, RecordData
+from .templates import TemplateRegistry, typeName, typeSelected
+from .stats import STATS, timedPhase
+
+def followAddress(raw_address: int, offset: int = MXE_SETTINGS.get("MXE_ADDRESS_OFFSET")) -> int:
+    """ Follow mxe address arithmetic.
+        This should be used to traverse addresses so that lists store real data as-is.
+    """
+    return raw_address+offset
+
+def readZeroDelBytes(buf, startpos: int) -> bytes:
+    """
+        Returns: bytes object
+        Read 0-delimeted byte sequence from <startpos> of a loaded or memory-mapped MXE buffer.
+        Terminator is found with a single search and the sequence is returned as one slice.
+        A sequence that runs into the end of the buffer is returned up to the end.
+    """
+    end = buf.find(b'\x00', startpos)
+    if end < 0:
+        end = len(buf)
+    return buf[startpos:end]
+
+def readStr(buf, startpos: int, encoding: str="shift_jisx0213"):
+    """
+        Returns: decoded string
+        Read 0-delimeted string from <startpos> of a loaded or memory-mapped MXE buffer.
+        In MXE most strings are detached from data.
+        shift_jisx0213 is the default encoding for VlMx<something> entries, which are internal/for devs.
+        Most in-game text is encoded outside of MXE files in VC4.
+    """
+    return codecs.decode(readZeroDelBytes(buf, startpos),encoding)
+
+class StringPool:
+    """
+        Per-file pool of 0-delimeted sequences keyed by resolved address.
+        Many pointers and TOC type names in MXE point to the same address, so each target is read and decoded once
+        and the very same object is handed out to every entry referencing it.
+    """
+    def __init__(self, buf, encoding: str="shift_jisx0213"):
+        self.buf = buf
+        self.encoding = encoding
+        self.raw = {}
+        self.strings = {}
+
+    def bytesAt(self, address: int) -> bytes:
+        """
+            Returns: raw bytes at <address>, see readZeroDelBytes
+        """
+        res = self.raw.get(address)
+        if res is None:
+            res = readZeroDelBytes(self.buf, address)
+            self.raw[address] = res
+        return res
+
+    def strAt(self, address: int) -> str:
+        """
+            Returns: decoded string at <address>, see readStr
+        """
+        res = self.strings.get(address)
+        if res is None:
+            res = codecs.decode(self.bytesAt(address), self.encoding)
+            self.strings[address] = res
+        return res
+
+""" ---------------------------------------------------"""
+"""                  MXE functions                    """
+""" ---------------------------------------------------"""
+
+"""
+    These functions read/write MXE file's main TOC and associated contents using a list of provided pre-made record templates. 
+    Does not read extra sections like PCRF, or extra possible tables that may be referenced at the start of the file in various MXEs.
+    For editing existing records, a CSV file can be applied to in-memory mxe model. Adding new records is not supported.
+    Format:
+    main_table = [
+        MxeEntry(
+            id: int (toc_field_id),
+            type: int (toc_field_type),
+            type_addr: int (toc_type_string_addr),
+            type_string: str (toc_type_string),
+            type_name: str (toc_type_string up to first ':', used for template lookups),
+            address: int (record_address),
+            data: RecordData (record data according to template, read on first access), None if there is no template
+        ),
+        ...
+    ]
+"""
+
+class MxeEntry:
+    """
+        One main TOC entry. There is one per record and a game_info.mxe has tens of thousands of them, so no per-instance dict.
+        Record data is materialized by its loader the first time data is accessed (see RecordLoader), until then only TOC fields are kept.
+        Indexing with 0-4 still returns the old list layout: [ id, type, [ type_addr, type_string, type_name ], address, data ]
+    """
+    __slots__ = ("id", "type", "type_addr", "type_string", "type_name", "address", "record", "loader")
+
+    def __init__(self, id: int, type: int, type_addr: int, type_string: str, type_name: str, address: int, data: RecordData = None):
+        self.id = id
+        self.type = type
+        self.type_addr = type_addr
+        self.type_string = type_string
+        self.type_name = type_name
+        self.address = address
+        self.record = data
+        self.loader = None
+
+    def __reduce__(self):
+        # loader holds the mxe buffer, so record is materialized and sent on its own
+        return (MxeEntry, (self.id, self.type, self.type_addr, self.type_string, self.type_name, self.address, self.data))
+
+    @property
+    def data(self) -> RecordData:
+        if self.loader is not None:
+            self.record = self.loader.load(self)
+            self.loader = None
+        return self.record
+
+    @data.setter
+    def data(self, data: RecordData):
+        self.record = data
+        self.loader = None
+
+    def isLoaded(self) -> bool:
+        """
+            Returns: True if record data was materialized already (or there is none), so it may have been changed
+        """
+        return self.loader is None
+
+    def __getitem__(self, i: int):
+        if i == 0:
+            return self.id
+        if i == 1:
+            return self.type
+        if i == 2:
+            return [ self.type_addr, self.type_string, self.type_name ]
+        if i == 3:
+            return self.address
+        if i == 4:
+            return self.data if self.data is not None else []
+        raise IndexError("MxeEntry index out of range")
+
+    def __repr__(self) -> str:
+        return "MxeEntry(" + str(self.id) + ", " + repr(self.type_string) + ", " + str(self.address) + ")"
+
+class RecordLoader:
+    """
+        Materializes records of one type on first access: cuts the record out of mxe buffer and resolves its pointers through string pool.
+        Entries not loaded yet keep the loader, and with it the buffer and string pool, alive.
+    """
+    def __init__(self, layout: RecordLayout, view: memoryview, strings: StringPool, mxe_settings: dict = MXE_SETTINGS):
+        self.layout = layout
+        self.view = view
+        self.strings = strings
+        self.classic_pointers = layout.classic_pointers if mxe_settings.get("RESOLVE_CLASSIC_POINTERS") else []
+        self.xlb_pointers = layout.xlb_pointers if mxe_settings.get("RESOLVE_XLB_POINTERS") else []
+        # big-endian pointers are unpacked as bytes and need their converter before they can be followed
+        self.pointer_fixups = [ (i, func) for i, func in layout.fixups if i in self.classic_pointers or i in self.xlb_pointers ]
+
+    def load(self, entry: MxeEntry) -> RecordData:
+        # record is a slice of the buffer, fields are only cut out when used
+        start = followAddress(entry.address)
+        data = RecordData(self.layout, self.view[start:start + self.layout.size])
+        STATS.count("records_loaded")
+        if self.classic_pointers or self.xlb_pointers:
+            self.resolve(data, data.decode())
+        return data
+
+    def loadAll(self, entries: list, decode: bool = True) -> list:
+        """
+            Materializes all given entries (TOC order).
+            Records of one type usually lie back to back in the file, each such run is decoded with a single iter_unpack call.
+            Returns: decoded field values of every entry, see RecordData.decode. They aren't kept on records.
+            Without decode, records are only unpacked as far as needed to resolve pointers and the returned values are None.
+        """
+        result = []
+        size = self.layout.size
+        k = 0
+        while k < len(entries):
+            end = k + 1
+            while end < len(entries) and entries[end].address == entries[end - 1].address + size:
+                end += 1
+            start = followAddress(entries[k].address)
+            run = self.view[start:start + (end - k) * size]
+            if size == 0 or len(run) < (end - k) * size:
+                # nothing to decode in bulk, or run is cut off by the end of file
+                for entry in entries[k:end]:
+                    entry.data = self.load(entry)
+                    result.append(entry.data.decode() if decode else None)
+            else:
+                if decode:
+                    runs = self.layout.decodeRun(run)
+                elif self.classic_pointers or self.xlb_pointers:
+                    # only pointer fields are needed, the other fixups of decode are skipped
+                    runs = self.pointerRun(run)
+                else:
+                    runs = [ None ] * (end - k)
+                for n, values in enumerate(runs):
+                    data = RecordData(self.layout, run[n * size:(n + 1) * size])
+                    if values is not None:
+                        self.resolve(data, values)
+                    entries[k + n].data = data
+                    result.append(values if decode else None)
+                STATS.count("records_loaded", end - k)
+                STATS.count("decode_runs")
+            k = end
+        return result
+
+    def pointerRun(self, buf):
+        """
+            Yields: unpacked fields of every record of <buf> (see RecordLayout.decodeRun), with only pointer fields converted
+        """
+        for unpacked in self.layout.values.iter_unpack(buf):
+            if self.pointer_fixups:
+                unpacked = list(unpacked)
+                for i, func in self.pointer_fixups:
+                    unpacked[i] = func(unpacked[i])
+            yield unpacked
+
+    def resolve(self, data: RecordData, values: list):
+        """
+            Resolves pointers of record from its decoded values
+        """
+        if self.classic_pointers or self.xlb_pointers:
+            resolved = {}
+            for i in self.classic_pointers:
+                resolved[i] = self.strings.strAt(followAddress(values[i]))
+            for i in self.xlb_pointers:
+                resolved[i] = self.strings.bytesAt(followAddress(values[i]))
+            data.resolved = resolved
+            STATS.count("string_resolutions", len(resolved))
+
+def loadEntries(entries: list, decode: bool = True) -> list:
+    """
+        Materializes entries of one record type that aren't loaded yet in bulk, see RecordLoader.loadAll
+        Returns: decoded field values of every entry, None for entries without data. Nothing is decoded and None is returned without decode.
+    """
+    pending = [ entry for entry in entries if not entry.isLoaded() ]
+    if not decode:
+        if pending:
+            pending[0].loader.loadAll(pending, False)
+        return None
+    decoded = {}
+    if pending:
+        for entry, values in zip(pending, pending[0].loader.loadAll(pending)):
+            decoded[id(entry)] = values
+    return [ decoded[id(entry)] if id(entry) in decoded else (entry.data.decode() if entry.data is not None else None) for entry in entries ]
+
+class MainTable(list):
+    """
+        main_table list (see format above) plus an index of record type name -> entries of that type in TOC order.
+        Index is filled as entries are appended while reading TOC, so whoever works one record type at a time
+        (CSV export/apply, MXE writer) doesn't have to filter the whole table again.
+        mapped is set when records are views of a memory-mapped file, which then can't be replaced while the table is alive.
+    """
+    def __init__(self):
+        super().__init__()
+        self.types = {}
+        self.mapped = False
+
+    def append(self, entry: MxeEntry):
+        super().append(entry)
+        self.types.setdefault(entry.type_name, []).append(entry)
+
+def openMXEBuffer(mxe_path: str, use_mmap: bool = False):
+    """
+        Returns: bytes of the whole MXE, or mmap object over it if use_mmap is set.
+        Records are later taken from the buffer as memoryview slices without copying.
+    """
+    with open(mxe_path, "rb") as f:
+        if use_mmap:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return f.read()
+
+# TOC entry fields in the order tocStruct returns them
+TOC_FIELDS = [ "TOC_FIELD_ID", "TOC_FIELD_TYPE", "TOC_FIELD_TYPENAME_ADDR", "TOC_FIELD_RECORD_ADDR" ]
+
+def tocStruct(mxe_settings: dict = MXE_SETTINGS) -> tuple:
+    """
+        Returns: (struct.Struct of one whole TOC entry, order) compiled from TOC_* settings.
+        Struct unpacks the fields sorted by offset, entry[order[k]] is the value of TOC_FIELDS[k].
+        Fields may come in any order in the entry, but must not overlap or run past TOC_ENTRY_SIZE.
+    """
+    fields = sorted(range(len(TOC_FIELDS)), key=lambda k: mxe_settings.get(TOC_FIELDS[k]))
+    fmt = mxe_settings.get("TOC_ENDIANNESS")
+    pos = 0
+    for k in fields:
+        offset = mxe_settings.get(TOC_FIELDS[k])
+        if offset < pos:
+            raise ValueError("Overlapping TOC fields in settings: " + TOC_FIELDS[k] + "=" + str(offset))
+        fmt += (str(offset - pos) + "x" if offset > pos else "") + "i"
+        pos = offset + 4
+    if mxe_settings.get("TOC_ENTRY_SIZE") < pos:
+        raise ValueError("TOC fields don't fit into TOC_ENTRY_SIZE=" + str(mxe_settings.get("TOC_ENTRY_SIZE")))
+    if mxe_settings.get("TOC_ENTRY_SIZE") > pos:
+        fmt += str(mxe_settings.get("TOC_ENTRY_SIZE") - pos) + "x"
+    return struct.Struct(fmt), [ fields.index(k) for k in range(len(TOC_FIELDS)) ]
+
+def readTOC(buf, strings: StringPool, main_table: MainTable, mxe_settings: dict = MXE_SETTINGS):
+    """
+        Appends main TOC entries of loaded or memory-mapped mxe <buf> to main_table. Only TOC and type name strings are read.
+    """
+    entry_count = struct.unpack_from("<i", buf, mxe_settings.get("MAIN_TABLE_COUNT_ADDR"))[0]
+    entry_start = struct.unpack_from("<i", buf, mxe_settings.get("MAIN_TABLE_STARTADDR_ADDR"))[0]
+    pos = followAddress(entry_start)
+    # whole TOC is decoded with one compiled struct in a single pass
+    toc_entry, (f_id, f_type, f_typename, f_record) = tocStruct(mxe_settings)
+    # views are released right away, so a memory map under buf can be closed afterwards
+    with memoryview(buf) as view, view[pos:pos + entry_count * toc_entry.size] as toc:
+        if len(toc) < entry_count * toc_entry.size:
+            raise ValueError("Main TOC runs past the end of file: " + str(entry_count) + " entries at " + str(pos))
+        # type strings come from the string pool, so every distinct one only has its type name cut out once
+        type_names = {}
+        for fields in toc_entry.iter_unpack(toc):
+            a1 = fields[f_typename]
+            type_string = strings.strAt(followAddress(a1))
+            if type_string not in type_names:
+                type_names[type_string] = typeName(type_string)
+            main_table.append(MxeEntry(fields[f_id], fields[f_type], a1, type_string, type_names[type_string], fields[f_record]))
+    STATS.count("string_resolutions", entry_count)
+
+@timedPhase("readMXETOC")
+def readMXETOC(mxe_path: str, mxe_settings: dict = MXE_SETTINGS) -> MainTable:
+    """
+        Returns: main table with TOC entries only, entries never get record data.
+        File is memory-mapped, so only pages with the TOC and type names are touched.
+    """
+    main_table = MainTable()
+    with open(mxe_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        readTOC(buf, StringPool(buf), main_table, mxe_settings)
+    return main_table
+
+@timedPhase("readMXEFile")
+def readMXEFile(mxe_path: str, templates: TemplateRegistry, mxe_settings: dict = MXE_SETTINGS, use_mmap: bool = False,
+                include_types: list = None, exclude_types: list = None) -> MainTable:
+    """
+        Step 1: Read main TOC
+        Records are not read here, every entry gets read and its pointers resolved the first time its data is accessed.
+        Record types left out by include_types/exclude_types (see typeSelected) stay in TOC, but their data is always None.
+    """
+    buf = openMXEBuffer(mxe_path, use_mmap)
+    STATS.count("bytes_mapped" if use_mmap else "bytes_read", len(buf))
+    view = memoryview(buf)
+    main_table = MainTable()
+    main_table.mapped = use_mmap
+    strings = StringPool(buf)
+
+    print("Reading main mxe TOC... ", end='')
+    readTOC(buf, strings, main_table, mxe_settings)
+    print("Done, total entry count is: " + str(len(main_table)))
+
+    """
+        Step 2: Attach loaders for data entries defined by TOC
+    """
+    readMXERecords(main_table, view, templates, strings, mxe_settings, include_types, exclude_types)
+    # buffer is not closed here, records keep referencing it
+    return main_table
+
+def readMXERecords(main_table: MainTable, view: memoryview, templates: TemplateRegistry, strings: StringPool, mxe_settings: dict = MXE_SETTINGS,
+                   include_types: list = None, exclude_types: list = None):
+    """
+        Attaches a loader to every TOC entry that has a template and passes type filters, see RecordLoader. Nothing is read until record data is accessed.
+    """
+    print("Preparing data entries... ", end='')
+    n = 0
+    skipped = 0
+    for type_name, entries in main_table.types.items():
+        if not typeSelected(type_name, include_types, exclude_types):
+            skipped += len(entries)
+            continue
+        # find template
+        layout = templates.layout(type_name)
+        if layout is None:
+            print("Template not found for: '", end='')
+            print(type_name.encode('shift_jisx0213'), end = '')
+            print("', " + str(len(entries)) + " entries will be skipped")
+            continue
+        loader = RecordLoader(layout, view, strings, mxe_settings)
+        for entry in entries:
+            entry.loader = loader
+        n += len(entries)
+    print("Done, total entries with templates: " + str(n) + ("" if skipped == 0 else ", filtered out: " + str(skipped)))
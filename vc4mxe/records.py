@@ -0,0 +1,143 @@
+"""
+    Records: templates compiled into struct layouts, and record data as a view of MXE buffer
+"""
+import struct
+
+from .datatypes import DataTypes, ConvertFunctions, StructCodes, roundFloat
+
+class RecordLayout:
+    """
+        Template compiled into struct format, so a whole record is decoded with one unpack_from call.
+            values  - decodes record into values, the same ones bytesToText would return for each field
+            offsets - start of every field in record, so RecordData can cut out single fields
+        Fields with datatypes not in DataTypes are reported once and left out of the layout.
+    """
+    def __init__(self, template: list):
+        self.template = template
+        self.name = template[0]
+        self.fields = []
+        for dt, name in template[1]:
+            if DataTypes.get(dt) != None:
+                self.fields.append((dt, name))
+            else:
+                print("Illegal template definition encountered and will be skipped: Field '" + dt + ":" + name + "' in template " + template[0])
+        self.types = [ dt for dt, _ in self.fields ]
+        self.sizes = [ DataTypes.get(dt) for dt in self.types ]
+        self.offsets = []
+        self.size = 0
+        for size in self.sizes:
+            self.offsets.append(self.size)
+            self.size += size
+        self.values = struct.Struct("<" + "".join(StructCodes.get(dt) for dt in self.types))
+        # post-processing of unpacked values: raw bytes go through ConvertFunctions, floats are rounded
+        self.fixups = []
+        for i, dt in enumerate(self.types):
+            if StructCodes.get(dt).endswith("s"):
+                self.fixups.append((i, ConvertFunctions.get(dt)))
+            elif dt == "<f":
+                self.fixups.append((i, roundFloat))
+        # pointer fields by kind
+        self.classic_pointers = [ i for i, dt in enumerate(self.types) if dt == "<p" or dt == ">p" ]
+        self.xlb_pointers = [ i for i, dt in enumerate(self.types) if dt == "<pi" or dt == ">pi" ]
+        self.xlb_ids = [ i for i, dt in enumerate(self.types) if dt == "<ip" or dt == ">ip" ]
+
+    def __reduce__(self):
+        # struct.Struct can't be pickled, so layout is compiled again from its template on the other side
+        return (RecordLayout, (self.template,))
+
+    def decode(self, buf, offset: int = 0) -> list:
+        """
+            Returns: list of decoded field values. Pointers are decoded to addresses.
+        """
+        values = list(self.values.unpack_from(buf, offset))
+        for i, func in self.fixups:
+            values[i] = func(values[i])
+        return values
+
+    def decodeRun(self, buf) -> list:
+        """
+            Returns: list of decoded field values (see decode) for every record of <buf>, which holds records back to back
+        """
+        result = []
+        for unpacked in self.values.iter_unpack(buf):
+            values = list(unpacked)
+            for i, func in self.fixups:
+                values[i] = func(values[i])
+            result.append(values)
+        return result
+
+class RecordData:
+    """
+        Field data of one main_table entry according to its RecordLayout.
+        Holds a memoryview slice of the record inside the loaded MXE, so no per-field bytes are copied until a field is used.
+        Indexing works like the old list of fields: field bytes, or [raw_addr, val] for resolved pointers.
+        Assigning a field copies the record into its own bytearray first, the MXE buffer itself is never modified.
+        Fields whose bytes were actually changed are remembered in dirty, so the writer only has to write those.
+        There are as many of these as records, so resolved and dirty stay None until a record actually has some.
+    """
+    __slots__ = ("layout", "view", "resolved", "dirty")
+
+    def __init__(self, layout: RecordLayout, view: memoryview, resolved: dict = None):
+        self.layout = layout
+        self.view = memoryview(view)
+        # field index -> value of resolved pointer
+        self.resolved = resolved if resolved else None
+        # indexes of changed fields
+        self.dirty = None
+
+    def __reduce__(self):
+        # memoryview can't be pickled, record bytes are copied instead
+        return (RecordData, (self.layout, bytes(self.view), self.resolved))
+
+    def __len__(self) -> int:
+        return len(self.layout.fields)
+
+    def __getitem__(self, i: int):
+        raw = self.raw(i)
+        if self.resolved is not None and i in self.resolved:
+            return [raw, self.resolved[i]]
+        return raw
+
+    def __setitem__(self, i: int, value):
+        if isinstance(value, list):
+            raw = value[0]
+            if self.resolved is None:
+                self.resolved = {}
+            self.resolved[i] = value[1]
+        else:
+            raw = value
+        start = self.layout.offsets[i]
+        end = start + self.layout.sizes[i]
+        if self.view[start:end] == raw:
+            return
+        if self.view.readonly:
+            self.view = memoryview(bytearray(self.view))
+        self.view[start:end] = raw
+        if self.dirty is None:
+            self.dirty = set()
+        self.dirty.add(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def raw(self, i: int) -> bytes:
+        """
+            Returns: bytes of a single field, pointers are not resolved
+        """
+        start = self.layout.offsets[i]
+        return bytes(self.view[start:start + self.layout.sizes[i]])
+
+    def decode(self) -> list:
+        """
+            Returns: list of decoded field values, see RecordLayout.decode
+        """
+        return self.layout.decode(self.view)
+
+    def dirtyFields(self) -> list:
+        """
+            Returns: [ (offset in record, field bytes) ] for changed fields
+        """
+        if not self.dirty:
+            return []
+        return [ (self.layout.offsets[i], self.raw(i)) for i in sorted(self.dirty) ]
@@ -0,0 +1,219 @@
+"""
+    Long-running server mode: JSON-RPC 2.0 over stdin/stdout, one request or response per line.
+    Templates, opened MXE files and xlb indexes stay in memory between requests, so an edit only costs the edit itself.
+    Progress messages of the library go to stderr, stdout only carries responses.
+
+    Methods (params are passed by name):
+        open     { path, use_mmap = false, reload = false,
+                   include_types = all, exclude_types = none }                  -> { path, entries, types: { type name: count } }
+        close    { path }                                                      -> true
+        read     { path, out_dir, xlb_path = <text_mx.xlb next to mxe> }       -> { out_dir }
+        query    { path, type, ids = all, xlb_path = <text_mx.xlb next to mxe> } -> { header, rows }, rows as in CSV export
+        apply    { path, csv_path | csv_dir }                                  -> { changed_entries }
+        write    { path, backup = false, atomic = false, debug_log = "" }       -> { changed_entries }
+        shutdown {}                                                            -> true
+"""
+import os
+import sys
+import json
+import inspect
+import argparse
+import contextlib
+
+from .settings import MXE_SETTINGS, OUTPUT_MODIFIERS, applyConfigFile
+from .templates import TemplateRegistry, readTemplates
+from .xlb import XlbData, loadXLB, xlbFixes
+from .csvio import buildColumnConverters
+from .reader import loadEntries
+from .mxefile import MxeFile
+from .cli import DEFAULT_TEMPLATE_PATH
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+class MxeServer:
+    """
+        Keeps templates, opened MXE files (keyed by absolute path) and loaded xlb files resident and runs requests against them
+    """
+    def __init__(self, templates: TemplateRegistry, mxe_settings: dict = MXE_SETTINGS, output_modifiers: dict = OUTPUT_MODIFIERS):
+        self.templates = templates
+        self.mxe_settings = mxe_settings
+        self.output_modifiers = output_modifiers
+        self.files = {}
+        self.xlbs = {}
+        self.running = True
+        self.methods = {
+            "open": self.open,
+            "close": self.close,
+            "read": self.read,
+            "query": self.query,
+            "apply": self.apply,
+            "write": self.write,
+            "shutdown": self.shutdown
+        }
+
+    def mxe(self, path: str) -> MxeFile:
+        """
+            Returns: opened MXE file, it is opened with default options if it isn't yet
+        """
+        path = os.path.abspath(path)
+        if path not in self.files:
+            self.open(path)
+        return self.files[path]
+
+    def xlb(self, mxe: MxeFile, xlb_path: str = None):
+        """
+            Returns: loaded xlb for resolving text ids, by default text_mx.xlb next to mxe. Empty XlbData if there is no such file.
+        """
+        if not self.mxe_settings.get("RESOLVE_XLB_STRINGS"):
+            return None
+        if xlb_path is None:
+            xlb_path = os.path.join(os.path.dirname(mxe.path), 'text_mx.xlb')
+        xlb_path = os.path.abspath(xlb_path)
+        if xlb_path not in self.xlbs:
+            if os.path.exists(xlb_path):
+                self.xlbs[xlb_path] = loadXLB(xlb_path, xlbFixes(xlb_path))
+            else:
+                print("XLB file not found, text ids will not be resolved: " + xlb_path)
+                self.xlbs[xlb_path] = XlbData()
+        return self.xlbs[xlb_path]
+
+    def open(self, path: str, use_mmap: bool = False, reload: bool = False, include_types: list = None, exclude_types: list = None) -> dict:
+        path = os.path.abspath(path)
+        if reload or path not in self.files:
+            self.files[path] = MxeFile(path, self.templates, self.mxe_settings, use_mmap, include_types, exclude_types)
+        mxe = self.files[path]
+        return { "path": path, "entries": len(mxe), "types": { name: len(entries) for name, entries in mxe.main_table.types.items() } }
+
+    def close(self, path: str) -> bool:
+        return self.files.pop(os.path.abspath(path), None) is not None
+
+    def read(self, path: str, out_dir: str, xlb_path: str = None) -> dict:
+        mxe = self.mxe(path)
+        mxe.writeCSV(out_dir, xlb_list=self.xlb(mxe, xlb_path), output_modifiers=self.output_modifiers)
+        return { "out_dir": out_dir }
+
+    def query(self, path: str, type: str, ids: list = None, xlb_path: str = None) -> dict:
+        mxe = self.mxe(path)
+        template = self.templates.find(type)
+        if template is None:
+            raise ValueError("Template not found for: " + type)
+        layout = self.templates.layout(type)
+        converters = buildColumnConverters(layout, self.xlb(mxe, xlb_path), self.mxe_settings, self.output_modifiers)
+        entries = mxe.entries(type)
+        if ids is not None:
+            wanted = set(ids)
+            entries = [ entry for entry in entries if entry.id in wanted ]
+        decoded = loadEntries(entries)
+        if None in decoded:
+            raise ValueError("Record type was filtered out when opening mxe: " + type)
+        header = [ 'RecordId', 'InternalName' ] + [ t[0] if t[1] == '' else t[0] + ":" + t[1] for t in template[1] ]
+        rows = []
+        for entry, values in zip(entries, decoded):
+            rows.append([ entry.id, entry.type_string ] + [ conv(entry.data, values) for conv in converters ])
+        return { "header": header, "rows": rows }
+
+    def apply(self, path: str, csv_path: str = None, csv_dir: str = None) -> dict:
+        mxe = self.mxe(path)
+        if csv_path is None and csv_dir is None:
+            raise ValueError("Either csv_path or csv_dir has to be given")
+        if csv_dir is not None:
+            mxe.applyCSVDir(csv_dir)
+        if csv_path is not None:
+            mxe.applyCSV(csv_path)
+        return { "changed_entries": changedEntries(mxe) }
+
+    def write(self, path: str, backup: bool = False, atomic: bool = False, debug_log: str = "") -> dict:
+        mxe = self.mxe(path)
+        changed = changedEntries(mxe)
+        mxe.write(backup, debug_log != "", debug_log, atomic)
+        return { "changed_entries": changed }
+
+    def shutdown(self) -> bool:
+        self.running = False
+        return True
+
+    def handle(self, line: str) -> dict:
+        """
+            Returns: JSON-RPC response for one request line, or None for notifications (requests without id), whatever their outcome.
+            Lines that aren't a JSON object can't be told apart from requests, so they are answered with id null.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return errorResponse(None, PARSE_ERROR, "Parse error: " + str(e))
+        if not isinstance(request, dict):
+            return errorResponse(None, INVALID_REQUEST, "Invalid request")
+        response = self.respond(request)
+        if "id" not in request:
+            return None
+        return response
+
+    def respond(self, request: dict) -> dict:
+        """
+            Returns: JSON-RPC response for a request object
+        """
+        request_id = request.get("id")
+        if not isinstance(request.get("method"), str):
+            return errorResponse(request_id, INVALID_REQUEST, "Invalid request")
+        method = self.methods.get(request["method"])
+        if method is None:
+            return errorResponse(request_id, METHOD_NOT_FOUND, "Method not found: " + request["method"])
+        params = request.get("params", {})
+        if not isinstance(params, dict):
+            return errorResponse(request_id, INVALID_PARAMS, "Params have to be passed by name")
+        try:
+            inspect.signature(method).bind(**params)
+        except TypeError as e:
+            return errorResponse(request_id, INVALID_PARAMS, str(e))
+        try:
+            # library progress messages must not end up between responses
+            with contextlib.redirect_stdout(sys.stderr):
+                result = method(**params)
+        except Exception as e:
+            return errorResponse(request_id, SERVER_ERROR, type(e).__name__ + ": " + str(e))
+        return { "jsonrpc": "2.0", "id": request_id, "result": result }
+
+    def serve(self, requests = sys.stdin, responses = sys.stdout):
+        """
+            Answers requests line by line until shutdown or end of input
+        """
+        for line in requests:
+            if line.strip() == "":
+                continue
+            response = self.handle(line)
+            if response is not None:
+                responses.write(json.dumps(response) + "\n")
+                responses.flush()
+            if not self.running:
+                break
+
+def changedEntries(mxe: MxeFile) -> int:
+    """
+        Returns: count of entries with changes not yet written out
+    """
+    return len([ entry for entry in mxe if entry.isLoaded() and entry.data is not None and entry.data.dirty ])
+
+def errorResponse(request_id, code: int, message: str) -> dict:
+    return { "jsonrpc": "2.0", "id": request_id, "error": { "code": code, "message": message } }
+
+def main():
+    parser = argparse.ArgumentParser(description="MXE server: JSON-RPC 2.0 requests on stdin, one per line, responses on stdout. See vc4mxe/server.py for methods.")
+    parser.add_argument("-t", "--template-csv-path", type=str, default=DEFAULT_TEMPLATE_PATH, help="Path to a CSV file containing record templates.")
+    parser.add_argument("-c", "--config-file", type=str, help="Path to configuration file. If omitted, hardcoded defaults are used.")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.config_file is not None:
+            print("Applying config file: " + args.config_file)
+            applyConfigFile(args.config_file)
+        print("Reading templates from file: " + args.template_csv_path)
+        templates = readTemplates(args.template_csv_path)
+    MxeServer(templates).serve()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+    Default MXE parsing settings and CSV output modifiers, both can be overridden from a json config file (see cfg.json)
+"""
+import json
+
+# MXE SETTINGS - can be altered via -c option
+MXE_SETTINGS = {
+    # this is added to every 0-based address
+    "MXE_ADDRESS_OFFSET": 0x40,
+    # where the count of main entry tables is stored
+    "MAIN_TABLE_COUNT_ADDR": 0xC8,
+    # where the start address of main table is stored
+    "MAIN_TABLE_STARTADDR_ADDR": 0xE0,
+
+    # total length of main table's table of contents entry
+    "TOC_ENTRY_SIZE": 32,
+    # < for little endian, > for big endian
+    "TOC_ENDIANNESS": "<",
+    # offsets for various TOC fields in toc entry (all 4-byte integers)
+    "TOC_FIELD_ID": 0,
+    "TOC_FIELD_TYPE": 4,
+    "TOC_FIELD_TYPENAME_ADDR": 8,
+    "TOC_FIELD_RECORD_ADDR": 16,
+    # follow pointers to get underlying values
+    "RESOLVE_CLASSIC_POINTERS": True,
+    "RESOLVE_XLB_POINTERS": True,
+    "RESOLVE_XLB_STRINGS": True
+}
+
+# output to csv modifiers - can be altered via -c option
+OUTPUT_MODIFIERS = {
+    "FORCE_HEX_OUTPUT": False,               # force output everything as hex, this overrules everything else
+    "FORCE_RAW_CLASSIC_POINTERS": False,     # do not output resolved values of classic pointers, output pointers themselves instead
+    "FORCE_RAW_XLB_POINTERS": False,         # do not output resolved values of xlb pointers, output pointers themselves instead
+    "FORCE_XLB_IDS": False                   # do not output resolved xlb strings, output xlb string IDs instead
+}
+
+def applyConfigFile(config_file: str, mxe_settings: dict = MXE_SETTINGS, output_modifiers: dict = OUTPUT_MODIFIERS):
+    """
+        Overrides settings with values from json config file, see cfg.json
+    """
+    with open(config_file) as cfg_json:
+        data = json.load(cfg_json)
+        for name in mxe_settings.keys():
+            if data['MXE_SETTINGS'][name] is not None:
+                mxe_settings[name] = data['MXE_SETTINGS'][name]
+        for name in output_modifiers.keys():
+            if data['OUTPUT_MODIFIERS'][name] is not None:
+                output_modifiers[name] = data['OUTPUT_MODIFIERS'][name]
@@ -0,0 +1,81 @@
+"""
+    Phase timing and counters instrumentation.
+    Disabled by default, instrumented code then only pays for a flag check.
+"""
+import time
+import functools
+import contextlib
+
+class Stats:
+    """
+        Wall time, CPU time and counters per phase:
+            { phase name: { "calls": int, "wall_s": float, "cpu_s": float, "counters": { counter name: int } } }
+        Counters are added to the innermost running phase. A phase running inside itself is counted once.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.phases = {}
+        self.stack = []
+
+    def reset(self):
+        self.phases = {}
+        self.stack = []
+
+    def phaseData(self, name: str) -> dict:
+        return self.phases.setdefault(name, { "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "counters": {} })
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        if not self.enabled or (self.stack and self.stack[-1] is self.phases.get(name)):
+            yield
+            return
+        data = self.phaseData(name)
+        self.stack.append(data)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            data["calls"] += 1
+            data["wall_s"] += time.perf_counter() - wall
+            data["cpu_s"] += time.process_time() - cpu
+            self.stack.pop()
+
+    def count(self, counter: str, n: int = 1):
+        if self.enabled and self.stack:
+            counters = self.stack[-1]["counters"]
+            counters[counter] = counters.get(counter, 0) + n
+
+    def merge(self, phases: dict, wall: bool = True):
+        """
+            Adds phases collected in another process. Without wall, only CPU time and counters are added,
+            for work done by helper processes inside a phase that is already timed here.
+        """
+        for name, other in phases.items():
+            data = self.phaseData(name)
+            if wall:
+                data["calls"] += other["calls"]
+                data["wall_s"] += other["wall_s"]
+            data["cpu_s"] += other["cpu_s"]
+            for counter, n in other["counters"].items():
+                data["counters"][counter] = data["counters"].get(counter, 0) + n
+
+    def report(self) -> dict:
+        return { "phases": self.phases }
+
+# instrumentation of this process
+STATS = Stats()
+
+def timedPhase(name: str):
+    """
+        Decorator running every call of the function as phase <name>
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not STATS.enabled:
+                return func(*args, **kwargs)
+            with STATS.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
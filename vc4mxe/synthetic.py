@@ -0,0 +1,153 @@
+"""
+    Synthetic MXE and XLB files for benchmarking without the game files.
+    Layout follows what the reader expects: TOC count and address at MAIN_TABLE_COUNT_ADDR/MAIN_TABLE_STARTADDR_ADDR,
+    records according to templates, pointer targets in a shared pool of 0-delimeted strings.
+"""
+import random
+import struct
+
+from .settings import MXE_SETTINGS
+from .templates import TemplateRegistry
+
+# strings pointed to by classic pointers, Japanese ones to exercise shift_jisx0213 decoding
+SYNTHETIC_NAMES = [ "dummy", "モデル", "武器", "Weapon_%d", "Name_%d", "" ]
+
+# templates with field types the VC4 template file doesn't use, so their code paths get records too
+SYNTHETIC_TEMPLATES = [
+    [ "VlMxSyntheticBigEndian", [ ("<i", "Id"), (">p", "Name"), (">pi", "Text"), (">i", "Value") ] ],
+]
+
+def addSyntheticTemplates(templates: TemplateRegistry) -> TemplateRegistry:
+    """
+        Adds SYNTHETIC_TEMPLATES to <templates>. Returns: templates
+    """
+    for template in SYNTHETIC_TEMPLATES:
+        templates.add(template)
+    return templates
+
+def xlbIds(count: int) -> list:
+    """
+        Returns: ids of synthetic xlb strings. They go 16 apart from 48, so readXLB puts them all in one section in order.
+    """
+    return [ 48 + 16 * k for k in range(count) ]
+
+def generateXLB(path: str, count: int, encoding: str = "shift_jisx0213") -> list:
+    """
+        Writes single-section xlb with <count> strings. Returns: list of xlb ids
+    """
+    ids = xlbIds(count)
+    out = bytearray(0x10)
+    struct.pack_into("<i", out, 0x4, 1)
+    descr = b"synthetic"
+    out += struct.pack("<iii", 8, count, len(descr)) + descr
+    for id in ids:
+        out += struct.pack("<ii", id, 0)
+    out += b"CHNK" + struct.pack("<i", count)
+    for id in ids:
+        text = ("Text %d\nsecond line" % id).encode(encoding) + b'\x00'
+        out += struct.pack("<ii", id, len(text)) + text
+    with open(path, "wb") as f:
+        f.write(out)
+    return ids
+
+class MxeBuilder:
+    """
+        Builds MXE image in memory. Addresses stored in the file are relative to MXE_ADDRESS_OFFSET, same as in real files.
+    """
+    def __init__(self, mxe_settings: dict = MXE_SETTINGS, encoding: str = "shift_jisx0213"):
+        self.mxe_settings = mxe_settings
+        self.encoding = encoding
+        self.out = bytearray(max(0x100, mxe_settings.get("MAIN_TABLE_STARTADDR_ADDR") + 4, mxe_settings.get("MAIN_TABLE_COUNT_ADDR") + 4))
+        self.strings = {}
+
+    def address(self) -> int:
+        return len(self.out) - self.mxe_settings.get("MXE_ADDRESS_OFFSET")
+
+    def align(self, n: int):
+        while len(self.out) % n:
+            self.out.append(0)
+
+    def string(self, text) -> int:
+        """
+            Returns: raw address of 0-delimeted string, equal strings are stored once
+        """
+        raw = text.encode(self.encoding) if isinstance(text, str) else text
+        address = self.strings.get(raw)
+        if address is None:
+            address = self.address()
+            self.out += raw + b'\x00'
+            self.strings[raw] = address
+        return address
+
+def randomField(builder: MxeBuilder, rnd: random.Random, dt: str, xlb_ids: list) -> bytes:
+    """
+        Returns: bytes of one field of datatype <dt> with a plausible random value
+    """
+    order = ">" if dt.startswith(">") else "<"
+    if dt in ("<i", ">i"):
+        return struct.pack(order + "i", rnd.randint(-1000, 100000))
+    if dt in ("<i2", ">i2"):
+        return struct.pack(order + "h", rnd.randint(-300, 3000))
+    if dt in ("<f", ">f"):
+        # quarters survive the 2 decimal rounding of CSV export, so applying unchanged CSVs changes nothing
+        return struct.pack(order + "f", 0.25 * rnd.randint(-400, 4000))
+    if dt in ("<h", ">h"):
+        return bytes(rnd.randint(0, 255) for _ in range(4))
+    if dt == "i1":
+        return struct.pack("b", rnd.randint(-128, 127))
+    if dt in ("<ip", ">ip"):
+        return struct.pack(order + "i", rnd.choice(xlb_ids) if xlb_ids else 0)
+    if dt in ("<pi", ">pi"):
+        text = str(rnd.choice(xlb_ids)) if xlb_ids and rnd.random() < 0.9 else ""
+        return struct.pack(order + "i", builder.string(text))
+    if dt in ("<p", ">p"):
+        name = rnd.choice(SYNTHETIC_NAMES)
+        return struct.pack(order + "i", builder.string(name % rnd.randint(0, 50) if "%d" in name else name))
+    raise ValueError("Unknown datatype: " + dt)
+
+def generateMXE(path: str, templates: TemplateRegistry, record_count: int, type_names: list = None, xlb_ids: list = None,
+                seed: int = 1, mxe_settings: dict = MXE_SETTINGS) -> dict:
+    """
+        Writes MXE with <record_count> records of random types from <type_names> (default: every template with fields).
+        Records of one type are stored back to back, like in game files.
+        Returns: { record type name: record count }
+    """
+    rnd = random.Random(seed)
+    if type_names is None:
+        type_names = [ name for name in templates if templates.layout(name).size > 0 ]
+    entries = [ (n, rnd.choice(type_names)) for n in range(record_count) ]
+
+    builder = MxeBuilder(mxe_settings)
+    type_addresses = {}
+    record_addresses = {}
+    for n, type_name in sorted(entries, key=lambda e: (e[1], e[0])):
+        layout = templates.layout(type_name)
+        fields = b"".join(randomField(builder, rnd, dt, xlb_ids) for dt in layout.types)
+        if type_name not in type_addresses:
+            type_addresses[type_name] = builder.string(type_name)
+        builder.align(4)
+        record_addresses[n] = builder.address()
+        builder.out += fields
+
+    # TOC goes last, some entries get a type string with a suffix after ':' like in game files
+    toc_order = mxe_settings.get("TOC_ENDIANNESS") + "i"
+    toc = bytearray()
+    for n, type_name in entries:
+        entry = bytearray(mxe_settings.get("TOC_ENTRY_SIZE"))
+        type_address = type_addresses[type_name] if n % 4 else builder.string(type_name + ":Sub%d" % n)
+        struct.pack_into(toc_order, entry, mxe_settings.get("TOC_FIELD_ID"), n)
+        struct.pack_into(toc_order, entry, mxe_settings.get("TOC_FIELD_TYPE"), n % 3)
+        struct.pack_into(toc_order, entry, mxe_settings.get("TOC_FIELD_TYPENAME_ADDR"), type_address)
+        struct.pack_into(toc_order, entry, mxe_settings.get("TOC_FIELD_RECORD_ADDR"), record_addresses[n])
+        toc += entry
+    builder.align(16)
+    struct.pack_into("<i", builder.out, mxe_settings.get("MAIN_TABLE_COUNT_ADDR"), record_count)
+    struct.pack_into("<i", builder.out, mxe_settings.get("MAIN_TABLE_STARTADDR_ADDR"), builder.address())
+    builder.out += toc
+    with open(path, "wb") as f:
+        f.write(builder.out)
+
+    counts = {}
+    for _, type_name in entries:
+        counts[type_name] = counts.get(type_name, 0) + 1
+    return counts
@@ -0,0 +1,71 @@
+"""
+    Record templates, read from VlMx_entry_templates.csv
+"""
+import csv
+import os
+
+from .records import RecordLayout
+from .stats import STATS, timedPhase
+
+class TemplateRegistry(dict):
+    """
+        Record templates keyed by record type name, so a TOC entry finds its template with a single lookup.
+        Values keep the usual template structure: [ NAME, [(FIELD DATA TYPE, FIELD NAME)] ]
+        Compiled RecordLayouts are built on first use and kept alongside.
+    """
+    def __init__(self):
+        super().__init__()
+        self.layouts = {}
+
+    def add(self, template: list):
+        # first definition of a type wins, same as the old linear search did
+        if template[0] not in self:
+            self[template[0]] = template
+
+    def find(self, type_name: str) -> list:
+        """
+            Returns template for record type name or None if there is no such template
+        """
+        return self.get(type_name)
+
+    def layout(self, type_name: str) -> RecordLayout:
+        """
+            Returns compiled layout for record type name or None if there is no such template
+        """
+        layout = self.layouts.get(type_name)
+        if layout is None:
+            template = self.get(type_name)
+            if template is None:
+                return None
+            layout = RecordLayout(template)
+            self.layouts[type_name] = layout
+        return layout
+
+@timedPhase("readTemplates")
+def readTemplates(path:str) -> TemplateRegistry:
+    """
+        Reads mxe entry templates from file
+        Returned template structure: { NAME: [ NAME, [(FIELD DATA TYPE, FIELD NAME)] ] }
+    """ 
+    templates = TemplateRegistry()
+    with open(path, newline = '')  as template_csv:
+        reader = csv.reader(template_csv, delimiter=',', quotechar='"')
+        for row in reader:
+            templates.add( [ row[0], [ tuple(x.split(':',1)) if ":" in x else (x, '') for x in row[1:]]] )
+    STATS.count("bytes_read", os.path.getsize(path))
+    STATS.count("records", len(templates))
+    return templates
+
+def typeName(type_string: str) -> str:
+    """
+        Record type name is the part of TOC type string before the first ':'
+    """
+    return type_string.split(':', 1)[0]
+
+def typeSelected(type_name: str, include_types: list = None, exclude_types: list = None) -> bool:
+    """
+        Returns: True if record type passes type filters. No include_types means every type not in exclude_types.
+    """
+    if include_types and type_name not in include_types:
+        return False
+    return not exclude_types or type_name not in exclude_types
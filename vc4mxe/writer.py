@@ -0,0 +1,141 @@
+"""
+    Writing changed records back to MXE
+"""
+import os
+import sys
+import shutil
+import tempfile
+import datetime
+
+from .settings import MXE_SETTINGS
+from .templates import TemplateRegistry
+from .reader import MainTable, followAddress
+from .stats import STATS, timedPhase
+
+@timedPhase("writeMXEFile")
+def writeMXEFile(mxe_path: str, main_table: MainTable, templates: TemplateRegistry, mxe_settings: dict = MXE_SETTINGS, backup: bool = True, debug:bool = False, debug_log: str = "", atomic: bool = False):
+    """
+        Writes changed fields out to mxe file.
+        By default the file is patched in place. With atomic set, a complete new file is written next to it and renamed over the original,
+        so an interrupted run never leaves a half-written mxe. Backup is then just a hardlink to the old file where the filesystem allows it.
+        Atomic write of a memory-mapped main table is refused: Windows doesn't allow replacing a file that is still mapped.
+    """
+    if atomic and main_table.mapped:
+        raise ValueError("Atomic write is not possible for memory-mapped mxe, read it without mmap")
+    backup_path = mxe_path + "_" + datetime.datetime.now().strftime("%Y-%m-%dT%H_%M_%S.bak")
+    if backup and not atomic:
+        print("Making a backup... ")
+        try:
+            shutil.copyfile(mxe_path, backup_path)
+        except:
+            print("Error:", sys.exc_info()[0])
+            return
+        print("Done")
+    
+    print("Writing out mxe...")
+    
+    if debug and debug_log != "" and debug_log != None:
+        mylog = open(debug_log, "w", encoding='utf-8')
+    else:
+        mylog = sys.stdout
+
+    # collect changed fields as absolute (address, bytes)
+    changes = []
+    n = 0
+    for type_name, entries in main_table.types.items():
+        template = templates.find(type_name)
+        if template is None:
+            continue
+        if debug:
+            mylog.write(str(template) + "\n")
+        for entry in entries:
+            # records never loaded can't have been changed
+            if entry.isLoaded() and entry.data is not None and entry.data.dirty:
+                start = followAddress(entry.address)
+                for offset, raw in entry.data.dirtyFields():
+                    changes.append((start + offset, raw))
+                    if debug:
+                        mylog.write("Entry " + str(entry.id) + " changed at: " + str(start + offset) + " -> " + str(raw) + "\n")
+                n += 1
+
+    ranges = coalesceRanges(changes)
+    if atomic:
+        replaceMXEFile(mxe_path, ranges, backup_path if backup else None)
+        if debug:
+            for start, data in ranges:
+                mylog.write("Patched at: " + str(start) + " | Wrote: " + str(len(data)) + " bytes\n")
+    else:
+        with open(mxe_path, "r+b") as f:
+            for start, data in ranges:
+                f.seek(start)
+                f.write(data)
+                STATS.count("seeks")
+                STATS.count("bytes_written", len(data))
+                if debug:
+                    mylog.write("Seek to: " + str(start) + " | Wrote: " + str(len(data)) + " bytes\n")
+
+    # file now matches in-memory data
+    for entries in main_table.types.values():
+        for entry in entries:
+            if entry.isLoaded() and entry.data is not None:
+                entry.data.dirty = None
+
+    STATS.count("records", n)
+    print("Done. Wrote " + str(len(ranges)) + " changed byte ranges (" + str(sum(len(data) for _, data in ranges)) + " bytes) in " + str(n) + " entries.")
+    if debug:
+        mylog.close()
+    return
+
+def replaceMXEFile(mxe_path: str, ranges: list, backup_path: str = None):
+    """
+        Builds patched copy of mxe file in a temp file in the same directory, flushes it to disk and renames it over the original.
+        If backup_path is given, the original file is kept there as a hardlink, or copied there where hardlinks are not available.
+        The original stays at mxe_path until the rename, so a failure at any step leaves it untouched.
+    """
+    with open(mxe_path, "rb") as f:
+        image = bytearray(f.read())
+    STATS.count("bytes_read", len(image))
+    for start, data in ranges:
+        image[start:start + len(data)] = data
+
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(mxe_path) + "_", suffix=".tmp", dir=os.path.dirname(os.path.abspath(mxe_path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(image)
+            STATS.count("bytes_written", len(image))
+            f.flush()
+            os.fsync(f.fileno())
+        shutil.copymode(mxe_path, tmp_path)
+        if backup_path is not None:
+            print("Making a backup... ")
+            try:
+                os.link(mxe_path, backup_path)
+            except OSError:
+                shutil.copyfile(mxe_path, backup_path)
+            print("Done")
+        os.replace(tmp_path, mxe_path)
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # make the rename itself durable where directories can be synced
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(mxe_path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def coalesceRanges(changes: list) -> list:
+    """
+        Returns: [ (address, bytearray) ] with adjacent or overlapping changes merged into one write, sorted by address.
+        Later changes win where they overlap.
+    """
+    ranges = []
+    for start, data in sorted(changes, key=lambda change: change[0]):
+        if ranges and start <= ranges[-1][0] + len(ranges[-1][1]):
+            cur_start, cur = ranges[-1]
+            cur[start - cur_start:start - cur_start + len(data)] = data
+        else:
+            ranges.append((start, bytearray(data)))
+    return ranges
@@ -0,0 +1,347 @@
+"""
+    XLB text container reading and xlb id -> text index cache
+"""
+import os
+import mmap
+import array
+import bisect
+import struct
+import codecs
+import hashlib
+
+from .datatypes import bytesAsLEInt, bytesAsString
+from .stats import STATS, timedPhase
+
+class XlbData(list):
+    """
+        Sections of an XLB file as returned by readXLB, plus an index of xlb id -> (text bytes, section, record)
+        built once after loading, so resolving an id doesn't walk through every section.
+    """
+    def __init__(self):
+        super().__init__()
+        self.index = {}
+
+    def buildIndex(self):
+        self.index = {}
+        for i, section in enumerate(self):
+            for j, record in enumerate(section[1]):
+                # first occurrence wins, same as the old sequential search
+                self.index.setdefault(int(record[0]), (record[1], i, j))
+
+    def find(self, id: int) -> bytes:
+        """
+            Returns: text bytes for xlb id or None if not found
+        """
+        res = self.index.get(id)
+        if res is None:
+            return None
+        return res[0]
+
+@timedPhase("readXLB")
+def readXLB(file_path: str, encoding:str="shift_jisx0213", fixes:str="game_info.mxe", debug_print:bool=False):
+    """
+        Hopefully read XLB text file. Format is a bit magical to me, so there are lv.80 manual parsing-based crutches involved.
+        General rules seem to be:
+            1) next id row = orders of 16 for sub-ids. So if next_id - prev_id = 16, next goes into next row, 32 -> skip 1, 48 = skip 2 etc.
+            2) entering new section, including 1st, "costs" extra 3 rows worth of IDs (or 48)
+            3) there may be empty sections
+        Jumping between sections is messy and sometimes doesn't match rules above. Some sections match id count to string count 1-to-1, 
+        so they should obviously start at 0th row but that doesn't always match new line calculation rules above.
+        Either the format isn't standalone (unlikely) or I just plain messed up my understanding of it (most likely). Either way, it sorta works for text_mx.xlb which is all I need atm :)
+        
+        output format (XlbData, which also carries an id index for lookups):
+        [
+            [
+                [recordSize, recordCount, description byte count, description bytes],
+                [
+                    [id, text bytes],
+                    ...
+                ]
+            ],
+            ...
+        ]
+    """
+    print("Reading XLB file: " + file_path)
+    f=open(file_path,"rb")
+    data = XlbData()
+    f.seek(0x4)
+    typeCount = bytesAsLEInt(f.read(4))
+    f.seek(0x10)
+    STATS.count("seeks", 2)
+    for _ in range(0,typeCount):
+        # read header + entries
+        recordSize = bytesAsLEInt(f.read(4))
+        recordCount = bytesAsLEInt(f.read(4))
+        descrLen = bytesAsLEInt(f.read(4))
+        descr = codecs.decode(f.read(descrLen),encoding)
+        rec_header = [ recordSize, recordCount, descrLen, descr]
+        # read records for this header
+        records = []
+        for _ in range(0, recordCount):
+            id = bytesAsLEInt(f.read(4))
+            records.append( [ id, '' ] )
+            f.seek(f.tell()+(recordSize-4))
+        STATS.count("seeks", recordCount)
+
+        # add everything to data
+        data.append( [ rec_header, records] )
+
+    if debug_print: print("Read categories, found count=" + str(len(data)))
+
+    # read actual data
+    chnkhead = bytesAsString(f.read(4))
+    if chnkhead != "CHNK":
+        print("Error reading XLB, expected CHNK after TOC at position " + str(f.tell()-4))
+        STATS.count("bytes_read", f.tell())
+        f.close()
+        data.buildIndex()
+        return data
+    recordCount = bytesAsLEInt(f.read(4))
+
+    if debug_print: print("Start reading CHNK, found recordCount=" + str(recordCount))
+
+    currHeader = 0 # header in data we currently write to
+    currRec = 0    # record in header we currently write to
+
+    #read first record by hand
+    rec_id2 = bytesAsLEInt(f.read(4))
+    rec_size = bytesAsLEInt(f.read(4))
+    rec_bytes = f.read(rec_size)
+    # remember previous id
+    prev_id2 = rec_id2
+    # calculate offset from 48
+    currRec += (rec_id2-48)//16
+    if fixes == "DL002" or fixes == "DL003":
+        currRec = 0
+
+    # write data
+    data[currHeader][1][currRec][1] = rec_bytes
+    # already read record count
+    i = 1
+
+    # read other records
+    while(i < recordCount):
+        # read new record
+        rec_id2 = bytesAsLEInt(f.read(4))
+        rec_size = bytesAsLEInt(f.read(4))
+        rec_bytes = f.read(rec_size)
+        if debug_print: print("i=" + str(i) + "|value=" + bytesAsString(rec_bytes))
+        # calculate difference between two records
+        add = (rec_id2 - prev_id2)//16
+       
+        if(currRec+add < data[currHeader][0][1]):
+            # within the same type, just add record
+            currRec = currRec+add
+        else:
+            # we reached the end of current type, calculate carryover
+            empty_old = data[currHeader][0][1] - 1 - currRec
+            currHeader += 1
+            currRec = add-empty_old-3
+                        
+            if debug_print: print("new header=" + str(currHeader) + "| currRec=" + str(currRec))
+            if debug_print: 
+                if currRec >= 0: print("short header test:" + str(currRec) + "?>" + str(data[currHeader][0][1]))
+                else: print("currRec < 0!")
+            
+            #crutches for places where format is apparently not respected
+            if fixes == "game_info.mxe":
+                if (rec_id2 == 108184 and prev_id2 == 108120):
+                    currRec = 0
+                    if debug_print: print("StageInfo->ResultInfo transition fix")
+                if (rec_id2 == 157496 and prev_id2 == 157368):
+                    currRec = 0
+                    if debug_print: print("WeaponRDInfo->GenericNames transition fix")            
+                if (rec_id2 == 160312 and prev_id2 == 160248):
+                    currRec = 0
+                    if debug_print: print("JobInfo->VehicleDev transition fix") 
+                if (rec_id2 == 168600 and prev_id2 == 168472):
+                    currRec = 0
+                    if debug_print: print("ForceInfo->CharacterEach transition fix") 
+                if (rec_id2 == 177416 and prev_id2 == 175880):
+                    currRec = 1
+                    if debug_print: print("VehicleAffiliation->Ranks transition fix")
+                if (rec_id2 == 174456 and prev_id2 == 172856):
+                    currRec = 0
+                    if debug_print: print("CharacterEach->VehicleEach transition fix")
+            
+            if fixes == "DL001":
+                if currHeader == 8:
+                    currRec = 0
+                    if debug_print: print("DLC001 transition fix header 8")
+                if currHeader == 9:
+                    currRec = 1
+                    if debug_print: print("DLC001 transition fix header 9")
+                if currHeader == 10:
+                    currRec = 1
+                    if debug_print: print("DLC001 transition fix header 10")
+            if fixes == "DL002":
+                if currHeader == 4:
+                    currRec = 0
+                    if debug_print: print("DLC002 transition fix header 4")
+                if currHeader == 5:
+                    currRec = 0
+                    if debug_print: print("DLC002 transition fix header 5")
+            if fixes == "DL003":
+                if currHeader == 4:
+                    currRec = 0
+                    if debug_print: print("DLC003 transition fix header 4")
+                if currHeader == 6:
+                    currRec = 0
+                    if debug_print: print("DLC003 transition fix header 6")
+                if currRec < 0:
+                    currRec = 0
+            if fixes == "DL006":
+                if(rec_id2 == 648 and prev_id2 == 584) or (rec_id2 == 712 and prev_id2 == 648):
+                    currRec = 0
+                    if debug_print: print("DLC006 transition fix")
+            # re-check for [normally] small empty type inbetween two
+            while(currRec >= data[currHeader][0][1]):
+                currRec = currRec-(data[currHeader][0][1]-1)-3
+                currHeader += 1
+                if debug_print:print("new header/short skip=" + str(currHeader) + "| currRec=" + str(currRec))
+
+
+        if debug_print: print("currHeader=" + str(currHeader) + " | currRec=" + str(currRec))
+        data[currHeader][1][currRec][1] = rec_bytes
+        if debug_print: print("assigned id:" + str(data[currHeader][1][currRec][0]) + " | string=" + bytesAsString(data[currHeader][1][currRec][1]))
+        prev_id2 = rec_id2
+        i = i+1
+    STATS.count("bytes_read", f.tell())
+    STATS.count("records", recordCount)
+    f.close()
+    data.buildIndex()
+    print("Done")
+    return data
+
+def findByIDInXLB(data: XlbData, id: int) -> bytes:
+    """
+        Return a string by xlb id or None if not found. See readXLB for expected data structure.
+        Goes through the id index built by readXLB.
+    """
+    STATS.count("xlb_lookups")
+    return data.find(id)
+
+XLB_INDEX_MAGIC = b"XLBI"
+XLB_INDEX_VERSION = 1
+XLB_INDEX_SUFFIX = ".idx"
+# magic, version, id count, key; native byte order, same as memoryview.cast used for lookups
+XLB_INDEX_HEADER = struct.Struct("=4sii16s4x")
+
+class XlbIndex:
+    """
+        Read-only xlb id -> text bytes index, memory-mapped from cache file written by saveXLBIndex.
+        Can be used in place of XlbData for resolving ids. File layout after the header:
+            sorted ids (int32), id count + 1 offsets (int32) into text blob, text blob
+        Raises ValueError if file size doesn't match the layout.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = XLB_INDEX_HEADER.unpack_from(self.buf, 0)[2] if len(self.buf) >= XLB_INDEX_HEADER.size else -1
+        offsets_start = XLB_INDEX_HEADER.size + 4 * self.count
+        self.blob_start = offsets_start + 4 * (self.count + 1)
+        # header, ids, offsets and text blob up to the last offset have to fill the file exactly
+        if self.count < 0 or len(self.buf) < self.blob_start or len(self.buf) != self.blob_start + struct.unpack_from("=i", self.buf, self.blob_start - 4)[0]:
+            # unmapped right away, so the cache file can be rewritten
+            self.buf.close()
+            raise ValueError("Xlb index file size doesn't match its contents: " + path)
+        view = memoryview(self.buf)
+        self.ids = view[XLB_INDEX_HEADER.size:offsets_start].cast('i')
+        self.offsets = view[offsets_start:self.blob_start].cast('i')
+
+    def __reduce__(self):
+        # mmap can't be pickled, worker processes map the file themselves
+        return (XlbIndex, (self.path,))
+
+    def find(self, id: int) -> bytes:
+        """
+            Returns: text bytes for xlb id or None if not found
+        """
+        i = bisect.bisect_left(self.ids, id)
+        if i == self.count or self.ids[i] != id:
+            return None
+        text = self.buf[self.blob_start + self.offsets[i]:self.blob_start + self.offsets[i + 1]]
+        # ids that never got a string are kept as '' in XlbData
+        return text if text != b'' else ''
+
+def xlbIndexKey(file_path: str, fixes: str) -> bytes:
+    """
+        Returns: key for xlb index cache - hash of xlb contents and fixes profile it was read with
+    """
+    with open(file_path, "rb") as f:
+        contents = f.read()
+        key = hashlib.blake2b(contents, digest_size=16)
+    STATS.count("bytes_read", len(contents))
+    key.update(fixes.encode())
+    return key.digest()
+
+def saveXLBIndex(index_path: str, data: XlbData, key: bytes):
+    """
+        Writes id index of xlb data to cache file, see XlbIndex for layout
+    """
+    ids = sorted(data.index)
+    offsets = array.array('i', [ 0 ])
+    blob = bytearray()
+    for id in ids:
+        text = data.index[id][0]
+        if text:
+            blob += text
+        offsets.append(len(blob))
+    try:
+        with open(index_path + ".tmp", "wb") as f:
+            f.write(XLB_INDEX_HEADER.pack(XLB_INDEX_MAGIC, XLB_INDEX_VERSION, len(ids), key))
+            f.write(array.array('i', ids).tobytes())
+            f.write(offsets.tobytes())
+            f.write(blob)
+        os.replace(index_path + ".tmp", index_path)
+        STATS.count("bytes_written", XLB_INDEX_HEADER.size + 4 * (2 * len(ids) + 1) + len(blob))
+    except OSError:
+        print("Could not write xlb index file: " + index_path)
+
+def loadXLBIndex(index_path: str, key: bytes) -> XlbIndex:
+    """
+        Returns: XlbIndex over cache file or None if there is no cache file matching key
+    """
+    try:
+        with open(index_path, "rb") as f:
+            header = f.read(XLB_INDEX_HEADER.size)
+    except OSError:
+        return None
+    if len(header) != XLB_INDEX_HEADER.size:
+        return None
+    magic, version, _, cached_key = XLB_INDEX_HEADER.unpack(header)
+    if magic != XLB_INDEX_MAGIC or version != XLB_INDEX_VERSION or cached_key != key:
+        return None
+    try:
+        return XlbIndex(index_path)
+    except (OSError, ValueError):
+        return None
+
+def xlbFixes(file_path: str) -> str:
+    """
+        Returns: readXLB fixes profile for xlb file, picked by its name
+    """
+    for dlc in [ "DL001", "DL002", "DL003", "DL006" ]:
+        if file_path.endswith(dlc + "_text_mx.xlb"):
+            return dlc
+    return "game_info.mxe"
+
+@timedPhase("readXLB")
+def loadXLB(file_path: str, fixes: str = "game_info.mxe", use_cache: bool = False):
+    """
+        Returns: XlbData read by readXLB, or with use_cache set, XlbIndex from '<xlb>.idx' cache file next to xlb.
+        Cache is rebuilt when xlb contents or fixes profile change.
+    """
+    if not use_cache:
+        return readXLB(file_path=file_path, fixes=fixes)
+    key = xlbIndexKey(file_path, fixes)
+    index = loadXLBIndex(file_path + XLB_INDEX_SUFFIX, key)
+    if index is not None:
+        print("Using XLB index cache: " + file_path + XLB_INDEX_SUFFIX)
+        STATS.count("bytes_mapped", len(index.buf))
+        STATS.count("cache_hits")
+        return index
+    data = readXLB(file_path=file_path, fixes=fixes)
+    saveXLBIndex(file_path + XLB_INDEX_SUFFIX, data, key)
+    return data